@@ -1,17 +1,25 @@
 # backend/app.py
 
 import os
-import json
-from flask import Flask, request, jsonify
+import re
+import queue
+import atexit
+import logging
+import orjson
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import JSONProvider
 from azure.ai.inference.models import SystemMessage, UserMessage, AssistantMessage
 from azure.identity import DefaultAzureCredential
 
 # Import custom services
-from openai_service import get_openai_completion, AZURE_OAI_ENDPOINT, AZURE_OAI_MODEL_NAME
+from openai_service import get_openai_completion, get_query_embedding, AZURE_OAI_ENDPOINT, AZURE_OAI_MODEL_NAME
 from search_service import AzureSearchService
 from blob_storage_service import BlobStorageService
-# SharePoint service might be used later for direct access or indexing setup
-# from sharepoint_service import SharePointService
+from cache_service import RedisCacheService
+from document_generator import generate_and_upload_docx
+from sharepoint_service import SharePointService
 
 # --- Monitoring Setup (Azure Monitor OpenTelemetry) ---
 # Configure OpenTelemetry to use Azure Monitor Exporter
@@ -23,10 +31,56 @@ if os.getenv("AZURE_MONITOR_CONNECTION_STRING"):
     configure_azure_monitor()
     print("Azure Monitor configured for OpenTelemetry.")
 else:
+    # Skip the SDKs' per-call tracing hooks when nothing is exporting spans
+    from azure.core.settings import settings as azure_settings
+    azure_settings.tracing_enabled = False
     print("Azure Monitor connection string not found. Skipping OpenTelemetry configuration.")
 
+# --- Logging Setup ---
+# Records are handed to a queue and written by a background thread, so bursts of service
+# errors (e.g. Graph throttling) never block request threads on stderr writes
+log_listener = None
+
+def start_log_listener():
+    """Routes root logger records through a queue drained by a background thread.
+
+    Called again in each gunicorn worker after fork, since the listener thread does not
+    survive the fork.
+    """
+    global log_listener
+    root_logger = logging.getLogger()
+    for handler in [h for h in root_logger.handlers if isinstance(h, QueueHandler)]:
+        root_logger.removeHandler(handler)
+    log_queue = queue.Queue(-1)
+    root_logger.addHandler(QueueHandler(log_queue))
+    log_listener = QueueListener(log_queue, logging.StreamHandler(), respect_handler_level=True)
+    log_listener.start()
+
+def stop_log_listener():
+    """Flushes queued log records on shutdown."""
+    if log_listener is not None:
+        log_listener.stop()
+
+start_log_listener()
+atexit.register(stop_log_listener)
+
 # --- Flask App Initialization ---
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, used by request.get_json() and jsonify()."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Write orjson's bytes straight into the response body, skipping the str round-trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # --- Load System Prompt ---
 try:
@@ -37,6 +91,27 @@ except FileNotFoundError:
     SYSTEM_PROMPT = "You are a helpful AI assistant." # Fallback prompt
     print("Warning: system_prompt.txt not found. Using default prompt.")
 
+# Fixed search contexts appended to the system prompt when no snippets are available
+NO_RESULTS_CONTEXT = "\n\nNo relevant documents found in the search index for this query."
+SEARCH_ERROR_CONTEXT = "\n\nError retrieving documents from search index."
+SEARCH_DISABLED_CONTEXT = "\n\nAzure AI Search service is not configured."
+
+# Returned when the model produced no content
+NO_RESPONSE_TEXT = "Sorry, I could not generate a response."
+
+# System messages for the fixed contexts are composed once instead of on every request
+STATIC_SYSTEM_MESSAGES = {
+    context: SystemMessage(content=SYSTEM_PROMPT + context)
+    for context in ("", NO_RESULTS_CONTEXT, SEARCH_ERROR_CONTEXT, SEARCH_DISABLED_CONTEXT)
+}
+
+def build_system_message(search_context):
+    """Returns the system message for a search context, reusing the precomposed fixed ones."""
+    system_message = STATIC_SYSTEM_MESSAGES.get(search_context)
+    if system_message is None:
+        system_message = SystemMessage(content=SYSTEM_PROMPT + search_context)
+    return system_message
+
 # --- Initialize Services ---
 # Use environment variables for configuration
 # These should be set in the Azure App Service configuration
@@ -54,6 +129,190 @@ except ValueError as e:
     print(f"Error initializing Azure Blob Storage: {e}. Document upload will be disabled.")
     blob_service = None
 
+try:
+    cache_service = RedisCacheService()
+    print("Redis cache service initialized.")
+except ValueError as e:
+    print(f"Error initializing Redis cache: {e}. Response caching will be disabled.")
+    cache_service = None
+
+# One SharePoint service per worker, so its pooled session and cached token are shared by
+# every request (used for direct document access and indexing setup)
+try:
+    sharepoint_service = SharePointService()
+    print("SharePoint service initialized.")
+except ValueError as e:
+    print(f"Error initializing SharePoint service: {e}. SharePoint access will be disabled.")
+    sharepoint_service = None
+
+# Generated documents smaller than this are returned inline as a data: URL instead of uploaded
+INLINE_DOCUMENT_MAX_BYTES = int(os.getenv("INLINE_DOCUMENT_MAX_BYTES", str(64 * 1024)))
+
+# Prompts made up entirely of small talk ("hi", "thanks!", "ok, bye") don't need retrieval
+SMALL_TALK = r"(?:hi|hello|hey|thanks|thank you|thx|ok|okay|great|cool|bye|goodbye)"
+CONVERSATIONAL_PROMPT = re.compile(
+    rf"^\s*{SMALL_TALK}(?:[\s,!.?]+{SMALL_TALK})*[\s!.?]*$",
+    re.IGNORECASE
+)
+
+def is_conversational_prompt(user_question):
+    """Returns True for pure small-talk prompts that can skip the Azure AI Search call."""
+    return CONVERSATIONAL_PROMPT.match(user_question) is not None
+
+# --- Background Executor ---
+# Shared pool used to run the search while the semantic cache (embedding + Redis KNN) is checked
+executor = ThreadPoolExecutor(max_workers=int(os.getenv("CHAT_EXECUTOR_WORKERS", "8")))
+
+def build_search_context(user_question):
+    """Queries Azure AI Search and formats the results as prompt context.
+
+    Args:
+        user_question: The question asked by the user.
+
+    Returns:
+        A tuple of (search_context, source_files).
+    """
+    search_context = ""
+    source_files = set() # Keep track of unique source files
+    if is_conversational_prompt(user_question):
+        return search_context, source_files
+    if cache_service:
+        cached = cache_service.get_search(user_question)
+        if cached is not None:
+            return cached["context"], set(cached["sources"])
+    if search_service:
+        try:
+            search_results = search_service.search_documents(user_question, top=3)
+            if search_results and search_results["results"]:
+                # Collect the snippets and join once rather than re-copying the context per result
+                context_parts = ["\n\nRelevant Document Snippets:\n"]
+                for result in search_results["results"]:
+                    # Include content and source file information
+                    content_snippet = result.get("content", "")
+                    source_file = result.get("sourceFile", "Unknown Source")
+                    context_parts.append(f"\n---\nSource: {source_file}\nSnippet: {content_snippet}\n---")
+                    source_files.add(source_file)
+                search_context = "".join(context_parts)
+            else:
+                search_context = NO_RESULTS_CONTEXT
+            if cache_service:
+                cache_service.set_search(user_question, {"context": search_context, "sources": list(source_files)})
+        except Exception as e:
+            print(f"Error during Azure AI Search query: {e}")
+            search_context = SEARCH_ERROR_CONTEXT
+    else:
+        search_context = SEARCH_DISABLED_CONTEXT
+    return search_context, source_files
+
+def upload_response_document(user_question, ai_response_text, source_files):
+    """Generates the DOCX response document and uploads it to Blob Storage.
+
+    Documents under INLINE_DOCUMENT_MAX_BYTES are returned as a data: URL and not uploaded.
+
+    Args:
+        user_question: The question asked by the user.
+        ai_response_text: The AI-generated answer.
+        source_files: The source files used to build the answer.
+
+    Returns:
+        The URL or data: URL of the document, or None if the upload was skipped or failed.
+    """
+    document_url = generate_and_upload_docx(
+        user_question, ai_response_text, list(source_files), blob_service,
+        inline_max_bytes=INLINE_DOCUMENT_MAX_BYTES
+    )
+    if document_url and not document_url.startswith("data:"):
+        print(f"Document uploaded to: {document_url}")
+    return document_url
+
+def lookup_semantic_response(user_question):
+    """Looks up a cached chat response for a semantically similar prompt.
+
+    Args:
+        user_question: The question asked by the user.
+
+    Returns:
+        A tuple of (cached_response, query_embedding). The embedding is returned so the new
+        response can be stored under it; both are None if the lookup failed.
+    """
+    cached_response = None
+    query_embedding = None
+    try:
+        query_embedding = get_query_embedding(user_question)
+        cached_response = cache_service.get_semantic(query_embedding)
+    except Exception as e:
+        print(f"Error during semantic cache lookup: {e}")
+    return cached_response, query_embedding
+
+def cache_chat_response(user_question, query_embedding, search_context, response_body):
+    """Stores a chat response in the exact-match and (if available) semantic caches.
+
+    Degraded responses are not cached, so a transient outage is not served for hours: the
+    search must have succeeded (or been skipped for small talk), the model must have
+    returned content, and the document must have been produced.
+    """
+    if not cache_service:
+        return
+    if search_context in (SEARCH_ERROR_CONTEXT, SEARCH_DISABLED_CONTEXT):
+        return
+    if response_body["ai_response"] == NO_RESPONSE_TEXT or not response_body.get("document_url"):
+        return
+    cache_service.set_chat(user_question, response_body)
+    if query_embedding is not None:
+        cache_service.set_semantic(query_embedding, user_question, response_body, AZURE_OAI_MODEL_NAME)
+
+def format_sse_event(payload):
+    """Formats a payload as a Server-Sent Events data frame."""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+def stream_chat_events(user_question, messages, search_context, source_files, query_embedding=None):
+    """Streams completion deltas as SSE frames, then the generated document URL.
+
+    Args:
+        user_question: The question asked by the user.
+        messages: The messages to send to Azure OpenAI.
+        search_context: The search context included in the messages.
+        source_files: The source files used to build the answer.
+        query_embedding: Optional prompt embedding used to store the response in the semantic cache.
+
+    Yields:
+        SSE frames: one {"delta": ...} event per completion chunk, followed by a final
+        {"document_url": ..., "sources": [...]} event.
+    """
+    response_parts = []
+    try:
+        for update in get_openai_completion(messages, stream=True):
+            if not update.choices:
+                continue
+            delta = update.choices[0].delta.content
+            if delta:
+                response_parts.append(delta)
+                yield format_sse_event({"delta": delta})
+    except Exception as e:
+        print(f"Error streaming from Azure OpenAI: {e}")
+        yield format_sse_event({"error": "Failed to get response from AI model"})
+        return
+
+    ai_response_text = "".join(response_parts) or NO_RESPONSE_TEXT
+    document_url = upload_response_document(user_question, ai_response_text, source_files)
+    yield format_sse_event({
+        "document_url": document_url,
+        "sources": list(source_files)
+    })
+    cache_chat_response(user_question, query_embedding, search_context, {
+        "ai_response": ai_response_text,
+        "sources": list(source_files),
+        "document_url": document_url
+    })
+
+def replay_cached_events(cached_response):
+    """Replays a cached chat response in the same SSE shape as stream_chat_events."""
+    yield format_sse_event({"delta": cached_response["ai_response"]})
+    yield format_sse_event({
+        "document_url": cached_response.get("document_url"),
+        "sources": cached_response.get("sources", [])
+    })
+
 # --- API Routes ---
 @app.route("/api/chat", methods=["POST"])
 def chat_handler():
@@ -61,71 +320,65 @@ def chat_handler():
     try:
         data = request.get_json()
         user_question = data.get("prompt")
+        # Clients opt into token streaming with {"stream": true} or an SSE Accept header
+        wants_stream = data.get("stream", False) or "text/event-stream" in request.headers.get("Accept", "")
         # history = data.get("history", []) # Future use: maintain conversation history
 
         if not user_question:
             return jsonify({"error": "No prompt provided"}), 400
 
         # 1. Search for relevant documents (Context Retrieval)
-        search_context = ""
-        source_files = set() # Keep track of unique source files
-        if search_service:
-            try:
-                search_results = search_service.search_documents(user_question, top=3)
-                if search_results and search_results["results"]:
-                    search_context += "\n\nRelevant Document Snippets:\n"
-                    for result in search_results["results"]:
-                        # Include content and source file information
-                        content_snippet = result.get("content", "")
-                        source_file = result.get("sourceFile", "Unknown Source")
-                        search_context += f"\n---\nSource: {source_file}\nSnippet: {content_snippet}\n---"
-                        source_files.add(source_file)
+        # An exact cache hit short-circuits both the search and the completion. Otherwise the
+        # search runs on the executor while the semantic lookup (prompt embedding and Redis
+        # vector query) happens here, and its result is discarded on a near-duplicate hit
+        cached_response = cache_service.get_chat(user_question) if cache_service else None
+        query_embedding = None
+        if cached_response is None:
+            if cache_service and cache_service.semantic_enabled:
+                search_future = executor.submit(build_search_context, user_question)
+                cached_response, query_embedding = lookup_semantic_response(user_question)
+                if cached_response is not None:
+                    search_future.cancel()
                 else:
-                    search_context = "\n\nNo relevant documents found in the search index for this query."
-            except Exception as e:
-                print(f"Error during Azure AI Search query: {e}")
-                search_context = "\n\nError retrieving documents from search index."
-        else:
-            search_context = "\n\nAzure AI Search service is not configured."
+                    search_context, source_files = search_future.result()
+            else:
+                search_context, source_files = build_search_context(user_question)
+        if cached_response is not None:
+            if wants_stream:
+                return Response(replay_cached_events(cached_response), mimetype="text/event-stream", headers={"X-Cache": "HIT"})
+            return jsonify(cached_response), 200, {"X-Cache": "HIT"}
 
         # 2. Prepare messages for OpenAI
         messages = [
-            SystemMessage(content=SYSTEM_PROMPT + search_context), # Add search context to system prompt
+            build_system_message(search_context), # Add search context to system prompt
             UserMessage(content=user_question)
         ]
 
         # 3. Call Azure OpenAI
+        if wants_stream:
+            # Tokens are forwarded as they arrive; the document is generated once the stream ends
+            return Response(stream_chat_events(user_question, messages, search_context, source_files, query_embedding), mimetype="text/event-stream")
+
         try:
             completion = get_openai_completion(messages)
-            ai_response_text = completion.choices[0].message.content if completion.choices else "Sorry, I could not generate a response."
+            ai_response_text = (completion.choices[0].message.content if completion.choices else None) or NO_RESPONSE_TEXT
         except Exception as e:
             print(f"Error calling Azure OpenAI: {e}")
             return jsonify({"error": "Failed to get response from AI model"}), 500
 
-        # 4. Generate Document and Upload (Placeholder for Step 013)
-        # This part will be implemented in the next step
-        # For now, we simulate the document URL
-        document_url = None
-        if blob_service:
-            # Simulate document generation and upload
-            try:
-                # In reality, call a function like: generate_and_upload_docx(user_question, ai_response_text, list(source_files))
-                simulated_blob_name = f"generated_docs/response_{user_question[:20].replace(' ', '_')}_{os.urandom(4).hex()}.docx"
-                # Simulate content (replace with actual docx bytes)
-                simulated_content = f"Question: {user_question}\n\nAnswer: {ai_response_text}\n\nSources: {', '.join(source_files) if source_files else 'N/A'}".encode("utf-8")
-                document_url = blob_service.upload_document(simulated_content, simulated_blob_name, content_type="text/plain") # Use text/plain for simulation
-                print(f"Simulated document uploaded to: {document_url}")
-            except Exception as e:
-                print(f"Error during simulated document upload: {e}")
-        else:
-            print("Blob service not configured. Skipping document upload.")
+        # 4. Generate Document and Upload
+        response_body = {
+            "ai_response": ai_response_text,
+            "sources": list(source_files), # Send back sources used
+            "document_url": upload_response_document(user_question, ai_response_text, source_files)
+        }
 
         # 5. Return response to frontend
-        return jsonify({
-            "ai_response": ai_response_text,
-            "document_url": document_url,
-            "sources": list(source_files) # Send back sources used
-        })
+        cache_chat_response(user_question, query_embedding, search_context, response_body)
+        headers = {"X-Cache": "MISS"}
+        if response_body["document_url"] and response_body["document_url"].startswith("data:"):
+            headers["X-Blob-Skipped"] = "true"
+        return jsonify(response_body), 200, headers
 
     except Exception as e:
         print(f"An unexpected error occurred in /api/chat: {e}")
@@ -0,0 +1,82 @@
+# backend/azure_clients.py
+
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from azure.core.pipeline.transport import RequestsTransport
+from azure.identity import DefaultAzureCredential
+
+# Connection settings shared by every Azure SDK client in the backend
+AZURE_CONNECTION_TIMEOUT = int(os.getenv("AZURE_CONNECTION_TIMEOUT", "5"))
+AZURE_READ_TIMEOUT = int(os.getenv("AZURE_READ_TIMEOUT", "30"))
+# Model calls can take minutes to produce a long answer (or the first streamed token), and
+# azure-core retries read timeouts, so they get the SDK default instead of the 30s above
+AZURE_OAI_READ_TIMEOUT = int(os.getenv("AZURE_OAI_READ_TIMEOUT", "300"))
+AZURE_POOL_MAXSIZE = int(os.getenv("AZURE_POOL_MAXSIZE", "100"))
+
+_session = None
+_session_lock = threading.Lock()
+_credential = None
+_credential_lock = threading.Lock()
+
+def get_credential():
+    """Returns the process-wide DefaultAzureCredential, creating it on first use.
+
+    Sharing one credential means its token cache is shared too, so each worker signs in
+    once rather than once per service client.
+
+    Returns:
+        The shared DefaultAzureCredential.
+    """
+    global _credential
+    if _credential is None:
+        with _credential_lock:
+            if _credential is None:
+                _credential = DefaultAzureCredential(exclude_interactive_browser_credential=True)
+    return _credential
+
+def get_http_session():
+    """Returns the process-wide requests.Session used by the Azure SDK clients.
+
+    The session keeps a bounded pool of persistent connections per host, so TCP and TLS
+    setup is paid once per connection rather than once per call.
+
+    Returns:
+        The shared requests.Session.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # The SDK pipelines apply their own retry policy, so urllib3 retries stay disabled
+                adapter = HTTPAdapter(
+                    pool_connections=10,
+                    pool_maxsize=AZURE_POOL_MAXSIZE,
+                    max_retries=Retry(total=False, redirect=False, raise_on_status=False)
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+def get_transport(read_timeout=AZURE_READ_TIMEOUT):
+    """Creates an Azure SDK transport backed by the shared connection pool.
+
+    Each client gets its own transport object (clients close their transport on close()),
+    but all of them share the underlying session, which they do not own.
+
+    Args:
+        read_timeout: Read timeout in seconds for the client's requests.
+
+    Returns:
+        A RequestsTransport instance.
+    """
+    return RequestsTransport(
+        session=get_http_session(),
+        session_owner=False,
+        connection_timeout=AZURE_CONNECTION_TIMEOUT,
+        read_timeout=read_timeout
+    )
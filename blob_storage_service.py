@@ -2,9 +2,17 @@
 
 import os
 from azure.storage.blob import BlobServiceClient, ContentSettings
-from azure.identity import DefaultAzureCredential
+from azure_clients import get_credential, get_transport
+
+# Documents larger than the single-put limit are uploaded as staged blocks, in parallel
+BLOB_UPLOAD_MAX_CONCURRENCY = int(os.getenv("BLOB_UPLOAD_MAX_CONCURRENCY", "4"))
+BLOB_MAX_SINGLE_PUT_SIZE = 4 * 1024 * 1024
+BLOB_MAX_BLOCK_SIZE = 4 * 1024 * 1024
 
 class BlobStorageService:
+    # Containers already confirmed to exist in this process, keyed by (account, container)
+    _checked_containers = set()
+
     def __init__(self, storage_account_name=None, container_name=None, connection_string=None):
         """Initialize the Azure Blob Storage service.
         
@@ -24,30 +32,46 @@ class BlobStorageService:
         # Initialize the blob service client
         if self.connection_string:
             # Use connection string if provided
-            self.blob_service_client = BlobServiceClient.from_connection_string(self.connection_string)
+            self.blob_service_client = BlobServiceClient.from_connection_string(
+                self.connection_string,
+                transport=get_transport(),
+                max_single_put_size=BLOB_MAX_SINGLE_PUT_SIZE,
+                max_block_size=BLOB_MAX_BLOCK_SIZE
+            )
         elif self.storage_account_name:
             # Use DefaultAzureCredential if storage account name is provided
             account_url = f"https://{self.storage_account_name}.blob.core.windows.net"
-            self.blob_service_client = BlobServiceClient(account_url=account_url, credential=DefaultAzureCredential())
+            self.blob_service_client = BlobServiceClient(
+                account_url=account_url,
+                credential=get_credential(),
+                transport=get_transport(),
+                max_single_put_size=BLOB_MAX_SINGLE_PUT_SIZE,
+                max_block_size=BLOB_MAX_BLOCK_SIZE
+            )
         else:
             raise ValueError("Either storage_account_name or connection_string must be provided")
         
         # Get a reference to the container
         self.container_client = self.blob_service_client.get_container_client(self.container_name)
         
-        # Create the container if it doesn't exist
-        try:
-            self.container_client.get_container_properties()
-        except Exception:
-            self.container_client.create_container()
+        # Create the container if it doesn't exist (checked once per process)
+        container_key = (self.blob_service_client.account_name, self.container_name)
+        if container_key not in BlobStorageService._checked_containers:
+            try:
+                self.container_client.get_container_properties()
+            except Exception:
+                self.container_client.create_container()
+            BlobStorageService._checked_containers.add(container_key)
     
-    def upload_document(self, document_content, blob_name, content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document"):
+    def upload_document(self, document_content, blob_name, content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document", length=None):
         """Upload a document to Azure Blob Storage.
         
         Args:
-            document_content: The content of the document (bytes).
+            document_content: The content of the document (bytes), or a readable binary
+                stream such as BytesIO, which is uploaded without an intermediate copy.
             blob_name: The name of the blob.
             content_type: The content type of the document.
+            length: The number of bytes to upload (required for streams).
             
         Returns:
             The URL of the uploaded document if successful, None otherwise.
@@ -59,8 +83,14 @@ class BlobStorageService:
             # Set content settings
             content_settings = ContentSettings(content_type=content_type)
             
-            # Upload the document
-            blob_client.upload_blob(document_content, overwrite=True, content_settings=content_settings)
+            # Upload the document (large documents are staged as blocks uploaded concurrently)
+            blob_client.upload_blob(
+                document_content,
+                length=length if length is not None else len(document_content),
+                overwrite=True,
+                content_settings=content_settings,
+                max_concurrency=BLOB_UPLOAD_MAX_CONCURRENCY
+            )
             
             # Return the URL of the uploaded document
             return blob_client.url
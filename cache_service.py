@@ -0,0 +1,238 @@
+# backend/cache_service.py
+
+import os
+import orjson
+import uuid
+import hashlib
+from array import array
+import redis
+
+# Search results and chat responses live in separate keyspaces so that re-indexing
+# can invalidate stale search context without discarding every cached answer.
+SEARCH_KEY_PREFIX = "search:"
+CHAT_KEY_PREFIX = "chat:"
+SEARCH_TTL_SECONDS = 3600      # 1 hour
+CHAT_TTL_SECONDS = 4 * 3600    # 4 hours
+
+# Semantic cache: prompt embeddings stored as hashes and indexed with RediSearch (HNSW)
+SEMANTIC_INDEX_NAME = "chat_idx"
+SEMANTIC_KEY_PREFIX = "sem:"
+SEMANTIC_EMBEDDING_DIM = int(os.getenv("SEMANTIC_EMBEDDING_DIM", "1536"))  # text-embedding-3-small
+SEMANTIC_MAX_DISTANCE = 0.05            # cosine distance, i.e. similarity >= 0.95
+
+class RedisCacheService:
+    def __init__(self, redis_url=None):
+        """Initialize the Redis cache service (e.g. Azure Cache for Redis).
+
+        Args:
+            redis_url: The Redis connection URL (rediss://:<key>@<host>:6380/0).
+        """
+        # These would typically come from environment variables in production
+        self.redis_url = redis_url or os.getenv("REDIS_URL")
+
+        if not self.redis_url:
+            raise ValueError("Missing required Redis configuration")
+
+        # Initialize the Redis client (connections are pooled and reused across requests)
+        self.client = redis.Redis.from_url(self.redis_url)
+
+        # The semantic cache needs the RediSearch module (e.g. Azure Cache for Redis Enterprise)
+        self.semantic_enabled = self._ensure_semantic_index()
+
+    def _ensure_semantic_index(self):
+        """Create the vector index used by the semantic cache if it does not exist.
+
+        Returns:
+            True if the index is available, False otherwise.
+        """
+        try:
+            self.client.execute_command(
+                "FT.CREATE", SEMANTIC_INDEX_NAME, "ON", "HASH",
+                "PREFIX", 1, SEMANTIC_KEY_PREFIX,
+                "SCHEMA", "embedding", "VECTOR", "HNSW", 6,
+                "DIM", SEMANTIC_EMBEDDING_DIM, "TYPE", "FLOAT32", "DISTANCE_METRIC", "COSINE"
+            )
+            return True
+        except redis.ResponseError as e:
+            if "already exists" in str(e).lower():
+                return True
+            print(f"Semantic cache unavailable: {e}")
+            return False
+        except Exception as e:
+            print(f"Semantic cache unavailable: {e}")
+            return False
+
+    @staticmethod
+    def make_key(prefix, text):
+        """Build a cache key from the SHA-256 of the normalized text.
+
+        Args:
+            prefix: The keyspace prefix (SEARCH_KEY_PREFIX or CHAT_KEY_PREFIX).
+            text: The prompt or query text.
+
+        Returns:
+            The cache key.
+        """
+        return prefix + hashlib.sha256(text.strip().lower().encode("utf-8")).hexdigest()
+
+    def _get_json(self, key):
+        """Get and decode a JSON value, returning None on a miss or error."""
+        try:
+            cached = self.client.get(key)
+            return orjson.loads(cached) if cached is not None else None
+        except Exception as e:
+            print(f"Error reading from Redis cache: {e}")
+            return None
+
+    def _set_json(self, key, value, ttl):
+        """Encode and store a JSON value with an expiry, ignoring errors."""
+        try:
+            self.client.setex(key, ttl, orjson.dumps(value))
+        except Exception as e:
+            print(f"Error writing to Redis cache: {e}")
+
+    def get_search(self, query_text):
+        """Get cached search context for a query.
+
+        Args:
+            query_text: The search query text.
+
+        Returns:
+            The cached value if found, None otherwise.
+        """
+        return self._get_json(self.make_key(SEARCH_KEY_PREFIX, query_text))
+
+    def set_search(self, query_text, value, ttl=SEARCH_TTL_SECONDS):
+        """Cache search context for a query.
+
+        Args:
+            query_text: The search query text.
+            value: A JSON-serializable value.
+            ttl: Expiry in seconds.
+        """
+        self._set_json(self.make_key(SEARCH_KEY_PREFIX, query_text), value, ttl)
+
+    def get_chat(self, prompt):
+        """Get a cached chat response for a prompt.
+
+        Args:
+            prompt: The user prompt.
+
+        Returns:
+            The cached response body if found, None otherwise.
+        """
+        return self._get_json(self.make_key(CHAT_KEY_PREFIX, prompt))
+
+    def set_chat(self, prompt, value, ttl=CHAT_TTL_SECONDS):
+        """Cache a chat response for a prompt.
+
+        Args:
+            prompt: The user prompt.
+            value: The JSON-serializable response body.
+            ttl: Expiry in seconds.
+        """
+        self._set_json(self.make_key(CHAT_KEY_PREFIX, prompt), value, ttl)
+
+    def _check_embedding_dim(self, embedding):
+        """Disable the semantic cache if embeddings do not match the index dimension.
+
+        A different embedding model (or a dimensions override) would otherwise make
+        every FT.SEARCH and HSET fail or never match.
+
+        Returns:
+            True if the embedding can be used with the index, False otherwise.
+        """
+        if len(embedding) == SEMANTIC_EMBEDDING_DIM:
+            return True
+        print(f"Semantic cache disabled: embedding has {len(embedding)} dimensions, "
+              f"index expects {SEMANTIC_EMBEDDING_DIM} (set SEMANTIC_EMBEDDING_DIM)")
+        self.semantic_enabled = False
+        return False
+
+    @staticmethod
+    def embedding_to_bytes(embedding):
+        """Pack an embedding into the FLOAT32 byte layout expected by RediSearch."""
+        return array("f", embedding).tobytes()
+
+    def get_semantic(self, embedding):
+        """Find a cached chat response for a semantically similar prompt.
+
+        Args:
+            embedding: The prompt embedding (sequence of floats).
+
+        Returns:
+            The cached response body if the nearest neighbour is within
+            SEMANTIC_MAX_DISTANCE, None otherwise.
+        """
+        if not self.semantic_enabled or not self._check_embedding_dim(embedding):
+            return None
+        try:
+            result = self.client.execute_command(
+                "FT.SEARCH", SEMANTIC_INDEX_NAME, "*=>[KNN 1 @embedding $v AS score]",
+                "PARAMS", 2, "v", self.embedding_to_bytes(embedding),
+                "RETURN", 2, "response", "score",
+                "DIALECT", 2
+            )
+            # Reply layout: [total, key, [field, value, ...], ...]
+            if not result or result[0] == 0:
+                return None
+            fields = dict(zip(result[2][::2], result[2][1::2]))
+            if float(fields[b"score"]) >= SEMANTIC_MAX_DISTANCE:
+                return None
+            return orjson.loads(fields[b"response"])
+        except Exception as e:
+            print(f"Error querying semantic cache: {e}")
+            return None
+
+    def set_semantic(self, embedding, prompt, value, model, ttl=CHAT_TTL_SECONDS):
+        """Store a chat response in the semantic cache.
+
+        Args:
+            embedding: The prompt embedding (sequence of floats).
+            prompt: The user prompt.
+            value: The JSON-serializable response body.
+            model: The name of the model that produced the response.
+            ttl: Expiry in seconds.
+        """
+        if not self.semantic_enabled or not self._check_embedding_dim(embedding):
+            return
+        key = f"{SEMANTIC_KEY_PREFIX}{uuid.uuid4().hex}"
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.hset(key, mapping={
+                "embedding": self.embedding_to_bytes(embedding),
+                "response": orjson.dumps(value),
+                "prompt_hash": self.make_key("", prompt),
+                "model": model
+            })
+            pipe.expire(key, ttl)
+            pipe.execute()
+        except Exception as e:
+            print(f"Error writing to semantic cache: {e}")
+
+    def invalidate_search(self):
+        """Delete every cached search entry (e.g. after the search index is rebuilt).
+
+        Returns:
+            The number of keys deleted.
+        """
+        deleted = 0
+        try:
+            for key in self.client.scan_iter(match=SEARCH_KEY_PREFIX + "*", count=500):
+                deleted += self.client.delete(key)
+        except Exception as e:
+            print(f"Error invalidating search cache: {e}")
+        return deleted
+
+# Example usage (for testing purposes)
+if __name__ == "__main__":
+    try:
+        # This requires environment variables to be set
+        cache_service = RedisCacheService()
+
+        cache_service.set_chat("What is the fund's ESG policy?", {"ai_response": "Example"}, ttl=60)
+        cached = cache_service.get_chat("  what is the fund's ESG policy?")
+        print(f"Cached response: {cached}")
+    except Exception as e:
+        print(f"Failed to use Redis cache: {e}")
+        print("Please ensure the REDIS_URL environment variable is set.")
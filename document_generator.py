@@ -2,23 +2,36 @@
 
 import io
 import os
+import base64
+import string
+import secrets
+import re
+import zipfile
 from datetime import datetime
+from functools import lru_cache
+from xml.sax.saxutils import escape
 from docx import Document
 from docx.shared import Pt, Inches, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.style import WD_STYLE_TYPE
 
-def create_docx_document(question, answer, sources=None):
+def _get_or_add_paragraph_style(styles, name):
+    """Returns the named paragraph style, adding it if the base template lacks it."""
+    if name in styles:
+        return styles[name]
+    return styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+
+@lru_cache(maxsize=1)
+def _base_document_bytes():
     """
-    Creates a DOCX document with the question, answer, and sources.
+    Builds the shared base document with styles and footer configured.
+    
+    Built once per process on first use; per-request documents are loaded from this
+    snapshot, so style registration is not repeated on every call. (A serialized snapshot
+    is used rather than copy.deepcopy, which does not reliably copy python-docx objects.)
     
-    Args:
-        question: The DDQ question
-        answer: The AI-generated answer
-        sources: List of source documents used (optional)
-        
     Returns:
-        A BytesIO object containing the DOCX document
+        The base DOCX document, containing no body paragraphs, as bytes
     """
     # Create a new Document
     doc = Document()
@@ -33,7 +46,7 @@ def create_docx_document(question, answer, sources=None):
     font.size = Pt(11)
     
     # Create a style for the title
-    style_title = styles.add_style('Title', WD_STYLE_TYPE.PARAGRAPH)
+    style_title = _get_or_add_paragraph_style(styles, 'Title')
     style_title.base_style = styles['Normal']
     style_title.font.name = 'Calibri'
     style_title.font.size = Pt(16)
@@ -41,25 +54,55 @@ def create_docx_document(question, answer, sources=None):
     style_title.font.color.rgb = RGBColor(0, 0, 139)  # Dark blue
     
     # Create a style for headings
-    style_heading = styles.add_style('Heading', WD_STYLE_TYPE.PARAGRAPH)
+    style_heading = _get_or_add_paragraph_style(styles, 'Heading')
     style_heading.base_style = styles['Normal']
     style_heading.font.name = 'Calibri'
     style_heading.font.size = Pt(14)
     style_heading.font.bold = True
     
     # Create a style for sources
-    style_source = styles.add_style('Source', WD_STYLE_TYPE.PARAGRAPH)
+    style_source = _get_or_add_paragraph_style(styles, 'Source')
     style_source.base_style = styles['Normal']
     style_source.font.name = 'Calibri'
     style_source.font.size = Pt(10)
     style_source.font.italic = True
     
+    # Add a footer
+    section = doc.sections[0]
+    footer = section.footer
+    footer_text = footer.paragraphs[0]
+    footer_text.text = "Hudson Advisors DDQ Assistant"
+    footer_text.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    
+    docx_bytes = io.BytesIO()
+    doc.save(docx_bytes)
+    return docx_bytes.getvalue()
+
+def _build_docx_with_python_docx(question, answer, sources=None, generated_on=None):
+    """
+    Builds the DOCX document through the python-docx object model.
+    
+    Used to produce template.docx and as the fallback when the template is unavailable.
+    
+    Args:
+        question: The DDQ question
+        answer: The AI-generated answer
+        sources: List of source documents used (optional)
+        generated_on: Text for the "Generated on" line (defaults to the current time)
+        
+    Returns:
+        A BytesIO object containing the DOCX document
+    """
+    # Load the preconfigured base document; only the per-request paragraphs are added below
+    doc = Document(io.BytesIO(_base_document_bytes()))
+    
     # Add a title
     title = doc.add_paragraph("DDQ Response", style='Title')
     title.alignment = WD_ALIGN_PARAGRAPH.CENTER
     
     # Add date and time
-    date_time = doc.add_paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    generated_on = generated_on or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    date_time = doc.add_paragraph(f"Generated on: {generated_on}")
     date_time.alignment = WD_ALIGN_PARAGRAPH.RIGHT
     
     # Add a horizontal line
@@ -88,13 +131,6 @@ def create_docx_document(question, answer, sources=None):
         for source in sources:
             doc.add_paragraph(f"• {source}", style='Source')
     
-    # Add a footer
-    section = doc.sections[0]
-    footer = section.footer
-    footer_text = footer.paragraphs[0]
-    footer_text.text = "Hudson Advisors DDQ Assistant"
-    footer_text.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
     # Save the document to a BytesIO object
     docx_bytes = io.BytesIO()
     doc.save(docx_bytes)
@@ -102,34 +138,158 @@ def create_docx_document(question, answer, sources=None):
     
     return docx_bytes
 
-def generate_and_upload_docx(question, answer, sources, blob_service):
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Maps every printable non-alphanumeric character to "_" for blob-name-safe question prefixes
+_BLOB_NAME_SAFE = str.maketrans({c: "_" for c in string.printable if not c.isalnum()})
+
+# --- Precompiled Template ---
+# template.docx is the python-docx layout above rendered with placeholders. Per request only
+# word/document.xml is re-rendered by string substitution; every other zip entry is reused
+# verbatim. Regenerate it with save_template_docx() after changing the layout.
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "template.docx")
+_DOCUMENT_XML = "word/document.xml"
+_QUESTION_TOKEN = "<w:t>{{QUESTION}}</w:t>"
+_ANSWER_TOKEN = "<w:t>{{ANSWER}}</w:t>"
+_SOURCE_TOKEN = "<w:t>• {{SOURCES}}</w:t>"
+_DATE_TOKEN = "{{DATE}}"
+# Characters that are not allowed in XML 1.0 documents
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def save_template_docx(path=TEMPLATE_PATH):
+    """Writes template.docx with the placeholders expected by create_docx_document."""
+    docx_bytes = _build_docx_with_python_docx("{{QUESTION}}", "{{ANSWER}}", ["{{SOURCES}}"], generated_on=_DATE_TOKEN)
+    with open(path, "wb") as f:
+        f.write(docx_bytes.getvalue())
+
+def _load_template(path=TEMPLATE_PATH):
+    """Loads template.docx and splits word/document.xml around the placeholders.
+
+    Returns:
+        A dict with the zip entries and document.xml fragments, or None if the template
+        is missing or malformed.
+    """
+    try:
+        with zipfile.ZipFile(path) as zf:
+            entries = [(info, zf.read(info)) for info in zf.infolist()]
+        document_xml = next(data for info, data in entries if info.filename == _DOCUMENT_XML).decode("utf-8")
+
+        # The sources block is the spacer paragraph, the "Sources:" heading and the source
+        # paragraph; it is dropped when there are no sources and the last one repeats per source.
+        source_pos = document_xml.index(_SOURCE_TOKEN)
+        source_start = document_xml.rindex("<w:p>", 0, source_pos)
+        source_end = document_xml.index("</w:p>", source_pos) + len("</w:p>")
+        heading_start = document_xml.rindex("<w:p>", 0, source_start)
+        block_start = document_xml.rindex("<w:p/>", 0, heading_start)
+        head = document_xml[:block_start]
+        for token in (_QUESTION_TOKEN, _ANSWER_TOKEN, _DATE_TOKEN):
+            if token not in head:
+                raise ValueError(f"placeholder {token} not found")
+
+        return {
+            "entries": entries,
+            "head": head,
+            "sources_heading": document_xml[block_start:source_start],
+            "source_paragraph": document_xml[source_start:source_end],
+            "tail": document_xml[source_end:]
+        }
+    except (OSError, KeyError, StopIteration, ValueError, zipfile.BadZipFile) as e:
+        print(f"Warning: could not load DOCX template ({e}). Falling back to python-docx.")
+        return None
+
+_TEMPLATE = _load_template()
+
+def _text_to_runs_xml(text):
+    """Converts plain text to escaped <w:t> run content, mapping newlines to line breaks."""
+    lines = escape(_INVALID_XML_CHARS.sub("", text), {'"': "&quot;"}).split("\n")
+    return "<w:br/>".join(f'<w:t xml:space="preserve">{line}</w:t>' for line in lines)
+
+def _render_template(question, answer, sources):
+    """Renders the precompiled template into a BytesIO DOCX document."""
+    document_xml = (
+        _TEMPLATE["head"]
+        .replace(_DATE_TOKEN, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        .replace(_QUESTION_TOKEN, _text_to_runs_xml(question))
+        .replace(_ANSWER_TOKEN, _text_to_runs_xml(answer))
+    )
+    if sources:
+        source_paragraph = _TEMPLATE["source_paragraph"]
+        document_xml += _TEMPLATE["sources_heading"] + "".join(
+            source_paragraph.replace(_SOURCE_TOKEN, _text_to_runs_xml(f"• {source}"))
+            for source in sources
+        )
+    document_xml += _TEMPLATE["tail"]
+
+    docx_bytes = io.BytesIO()
+    with zipfile.ZipFile(docx_bytes, "w", zipfile.ZIP_DEFLATED) as zf:
+        for info, data in _TEMPLATE["entries"]:
+            if info.filename == _DOCUMENT_XML:
+                data = document_xml.encode("utf-8")
+            zf.writestr(info, data)
+    docx_bytes.seek(0)
+    return docx_bytes
+
+def create_docx_document(question, answer, sources=None):
+    """
+    Creates a DOCX document with the question, answer, and sources.
+    
+    Args:
+        question: The DDQ question
+        answer: The AI-generated answer
+        sources: List of source documents used (optional)
+        
+    Returns:
+        A BytesIO object containing the DOCX document
+    """
+    if _TEMPLATE is None:
+        return _build_docx_with_python_docx(question, answer, sources)
+    return _render_template(question, answer, sources)
+
+def generate_and_upload_docx(question, answer, sources, blob_service, inline_max_bytes=0):
     """
     Generates a DOCX document and uploads it to Azure Blob Storage.
     
+    Documents smaller than inline_max_bytes are not uploaded; they are returned inline
+    as a base64 data: URL, saving the Blob Storage round-trip and the browser's fetch.
+    
     Args:
         question: The DDQ question
         answer: The AI-generated answer
         sources: List of source documents used
-        blob_service: Instance of BlobStorageService
+        blob_service: Instance of BlobStorageService (may be None if only inlining)
+        inline_max_bytes: Size below which the document is returned as a data: URL
         
     Returns:
-        The URL of the uploaded document if successful, None otherwise
+        The URL (or data: URL) of the document if successful, None otherwise
     """
     try:
-        # Generate a unique blob name
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        # Create a safe filename from the question (first 30 chars)
-        safe_question = "".join(c if c.isalnum() else "_" for c in question[:30])
-        blob_name = f"ddq_responses/{timestamp}_{safe_question}.docx"
-        
         # Create the DOCX document
         docx_bytes = create_docx_document(question, answer, sources)
         
-        # Upload the document to Blob Storage
+        # Small documents are returned inline instead of being uploaded
+        # (getbuffer() is a zero-copy view of the BytesIO contents)
+        with docx_bytes.getbuffer() as document_view:
+            document_size = document_view.nbytes
+            if document_size < inline_max_bytes:
+                return f"data:{DOCX_CONTENT_TYPE};base64,{base64.b64encode(document_view).decode('ascii')}"
+        
+        if blob_service is None:
+            print("Blob service not configured. Skipping document upload.")
+            return None
+        
+        # Generate a unique blob name (the random suffix keeps same-second repeats apart)
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        # Create a safe filename from the question (first 30 chars)
+        safe_question = question[:30].translate(_BLOB_NAME_SAFE)
+        blob_name = f"ddq_responses/{timestamp}_{safe_question}_{secrets.token_hex(4)}.docx"
+        
+        # Upload the document to Blob Storage, streaming from the buffer rather than copying it
+        docx_bytes.seek(0)
         document_url = blob_service.upload_document(
-            docx_bytes.getvalue(), 
+            docx_bytes, 
             blob_name,
-            content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            content_type=DOCX_CONTENT_TYPE,
+            length=document_size
         )
         
         return document_url
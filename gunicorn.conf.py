@@ -0,0 +1,31 @@
+# backend/gunicorn.conf.py
+
+import os
+import multiprocessing
+
+# Bind to the port provided by Azure App Service
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# One process per core, each serving concurrent requests on a thread pool. The Azure SDK
+# clients are synchronous, so threaded workers give each in-flight chat its own thread.
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count())
+threads = int(os.getenv("GUNICORN_THREADS") or 8)
+
+# Streamed completions can run for a while; keep idle client connections open briefly
+timeout = 120
+keepalive = 5
+
+# Import the app (and load the system prompt, DOCX template and SDK modules) once in the
+# master and share it copy-on-write across the forked workers
+preload_app = True
+
+def post_fork(server, worker):
+    """Drop pooled HTTP connections inherited from the master so workers never share sockets,
+    and start the worker's own log listener thread."""
+    from azure_clients import get_http_session
+    from app import sharepoint_service, start_log_listener
+    get_http_session().close()
+    if sharepoint_service is not None:
+        sharepoint_service.close()
+    start_log_listener()
@@ -1,35 +1,48 @@
 # backend/openai_service.py
 
 import os
-from azure.ai.inference import ChatCompletionsClient
+import itertools
+from functools import lru_cache
+from azure.ai.inference import ChatCompletionsClient, EmbeddingsClient
 from azure.ai.inference.models import SystemMessage, UserMessage, AssistantMessage
-from azure.identity import DefaultAzureCredential
+from azure_clients import get_credential, get_transport, AZURE_OAI_READ_TIMEOUT
 
 # Use the specific endpoint provided by the user
 AZURE_OAI_ENDPOINT = "https://bfija-m83d9xpw-eastus2.services.ai.azure.com/models"
 AZURE_OAI_MODEL_NAME = "o4-mini-custom-gpt"
+AZURE_OAI_EMBEDDING_MODEL_NAME = os.getenv("AZURE_OAI_EMBEDDING_MODEL_NAME", "text-embedding-3-small")
 
-# Initialize the client using DefaultAzureCredential
+# The clients are created on first use with the shared DefaultAzureCredential
 # Ensure environment variables like AZURE_CLIENT_ID, AZURE_CLIENT_SECRET, AZURE_TENANT_ID are set
 # in the Azure App Service configuration for this to work.
-credential = DefaultAzureCredential()
-client = ChatCompletionsClient(endpoint=AZURE_OAI_ENDPOINT, credential=credential)
+@lru_cache(maxsize=1)
+def get_chat_client():
+    """Returns the shared ChatCompletionsClient, creating it on first use."""
+    return ChatCompletionsClient(endpoint=AZURE_OAI_ENDPOINT, credential=get_credential(), transport=get_transport(AZURE_OAI_READ_TIMEOUT))
 
-def get_openai_completion(messages: list, max_tokens: int = 1500):
+@lru_cache(maxsize=1)
+def get_embeddings_client():
+    """Returns the shared EmbeddingsClient, creating it on first use."""
+    return EmbeddingsClient(endpoint=AZURE_OAI_ENDPOINT, credential=get_credential(), transport=get_transport(AZURE_OAI_READ_TIMEOUT))
+
+def get_openai_completion(messages: list, max_tokens: int = 1500, stream: bool = False):
     """Gets a completion from the Azure OpenAI service.
 
     Args:
         messages: A list of message objects (SystemMessage, UserMessage, AssistantMessage).
         max_tokens: The maximum number of tokens to generate.
+        stream: If True, return an iterator of incremental updates instead of the full response.
 
     Returns:
-        The response object from the ChatCompletionsClient.
+        The response object from the ChatCompletionsClient, or a StreamingChatCompletions
+        iterator when stream is True.
     """
     try:
-        response = client.complete(
+        response = get_chat_client().complete(
             messages=messages,
             model=AZURE_OAI_MODEL_NAME,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            stream=stream
         )
         return response
     except Exception as e:
@@ -37,6 +50,38 @@ def get_openai_completion(messages: list, max_tokens: int = 1500):
         # In a real app, you'd want more robust error handling/logging
         raise
 
+@lru_cache(maxsize=4096)
+def _embed_normalized_query(text: str):
+    """Embeds already-normalized query text; memoized so repeated prompts skip the model call."""
+    try:
+        response = get_embeddings_client().embed(
+            input=[text],
+            model=AZURE_OAI_EMBEDDING_MODEL_NAME
+        )
+        return tuple(response.data[0].embedding)
+    except Exception as e:
+        print(f"Error calling Azure OpenAI embeddings: {e}")
+        raise
+
+_embedding_calls = itertools.count(1)
+
+def get_query_embedding(text: str):
+    """Gets an embedding vector for a query from the Azure OpenAI embedding model.
+
+    Queries are normalized (stripped and lower-cased) and served from an in-process
+    LRU cache, so identical or whitespace-variant prompts are embedded only once.
+
+    Args:
+        text: The text to embed.
+
+    Returns:
+        The embedding as a tuple of floats.
+    """
+    embedding = _embed_normalized_query(text.strip().lower())
+    if next(_embedding_calls) % 1000 == 0:
+        print(f"Query embedding cache: {_embed_normalized_query.cache_info()}")
+    return embedding
+
 # Example usage (for testing purposes, will be integrated into Flask app later)
 if __name__ == '__main__':
     try:
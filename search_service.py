@@ -1,9 +1,52 @@
 # backend/search_service.py
 
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
 from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError
 from azure.search.documents import SearchClient
 from azure.search.documents.models import QueryType
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
+from azure_clients import get_transport
+
+# Only the fields read by search_documents cross the wire
+SEARCH_SELECT_FIELDS = ["id", "title", "sourceFile", "content"]
+SEARCH_TEXT_FIELDS = ["content", "title"]
+
+# Throttling protection: cap concurrent searches per worker and back off on 429/503. Transient
+# gateway and server errors (500/502/504) are retried the same way, since the SDK's own status
+# retries are disabled
+SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", "20"))
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+MAX_RETRY_AFTER_SECONDS = 10
+_search_slots = threading.BoundedSemaphore(SEARCH_MAX_CONCURRENCY)
+_backoff = wait_random_exponential(multiplier=0.2, max=2.0)
+
+# Fan-out of sub-queries (multi-query, HyDE) runs on a shared pool bounded to this many searches
+SEARCH_BATCH_CONCURRENCY = int(os.getenv("SEARCH_BATCH_CONCURRENCY", "8"))
+_batch_executor = ThreadPoolExecutor(max_workers=SEARCH_BATCH_CONCURRENCY, thread_name_prefix="search-batch")
+
+# In-process cache of recent results, so repeated queries skip the network hop entirely
+SEARCH_RESULT_CACHE_SIZE = int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "1024"))
+SEARCH_RESULT_CACHE_TTL = int(os.getenv("SEARCH_RESULT_CACHE_TTL", "300"))
+_result_cache = TTLCache(maxsize=SEARCH_RESULT_CACHE_SIZE, ttl=SEARCH_RESULT_CACHE_TTL)
+_result_cache_lock = threading.Lock()
+
+def _is_retryable(exception):
+    """Returns True for throttling and transient server errors from Azure AI Search."""
+    return isinstance(exception, HttpResponseError) and exception.status_code in RETRYABLE_STATUS_CODES
+
+def _wait_for_retry_after(retry_state):
+    """Waits for the service's Retry-After interval, or exponential backoff with jitter."""
+    exception = retry_state.outcome.exception()
+    response = getattr(exception, "response", None)
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return min(float(retry_after), MAX_RETRY_AFTER_SECONDS)
+    except (TypeError, ValueError):
+        return _backoff(retry_state)
 
 class AzureSearchService:
     def __init__(self, search_service_name=None, search_index_name=None, search_api_key=None):
@@ -29,7 +72,11 @@ class AzureSearchService:
         self.search_client = SearchClient(
             endpoint=self.search_endpoint,
             index_name=self.search_index_name,
-            credential=AzureKeyCredential(self.search_api_key)
+            credential=AzureKeyCredential(self.search_api_key),
+            transport=get_transport(),
+            # Throttled and transient 5xx responses are retried by _execute_search (with a capped
+            # Retry-After); status retries in the SDK pipeline as well would multiply the requests sent
+            retry_status=0
         )
     
     def search_documents(self, query_text, filter_condition=None, top=5):
@@ -37,13 +84,72 @@ class AzureSearchService:
         
         Args:
             query_text: The search query text.
-            filter_condition: Optional OData filter condition.
+            filter_condition: Optional OData filter condition applied before ranking
+                (e.g. "sourceFile eq 'ESG Policy.pdf'"); the referenced fields must be
+                filterable in the index.
             top: Maximum number of results to return.
             
         Returns:
-            A list of search results.
+            A list of search results. Results are cached in-process for
+            SEARCH_RESULT_CACHE_TTL seconds and must not be modified by the caller.
         """
+        key = (query_text.strip().lower(), filter_condition, top)
+        with _result_cache_lock:
+            cached = _result_cache.get(key)
+        if cached is not None:
+            return cached
+
         try:
+            search_results = self._execute_search(query_text, filter_condition, top)
+        except Exception as e:
+            print(f"Error searching documents: {e}")
+            raise
+
+        with _result_cache_lock:
+            _result_cache[key] = search_results
+        return search_results
+
+    def search_documents_batch(self, queries, filter_condition=None, top=5):
+        """Run several search queries concurrently and merge their results.
+        
+        Latency is that of the slowest query rather than the sum of all of them.
+        
+        Args:
+            queries: The search query texts.
+            filter_condition: Optional OData filter condition applied to every query.
+            top: Maximum number of results to return per query.
+            
+        Returns:
+            Results in the same shape as search_documents, deduplicated by document id
+            (keeping the highest score) and sorted by descending score.
+        """
+        futures = [
+            _batch_executor.submit(self.search_documents, query_text, filter_condition, top)
+            for query_text in queries
+        ]
+        merged = {}
+        for future in futures:
+            for document in future.result()["results"]:
+                existing = merged.get(document["id"])
+                if existing is None or document["score"] > existing["score"]:
+                    merged[document["id"]] = document
+        
+        search_results = sorted(merged.values(), key=lambda document: document["score"], reverse=True)
+        return {
+            "count": len(search_results),
+            "results": search_results
+        }
+
+    @retry(
+        stop=stop_after_attempt(4),
+        wait=_wait_for_retry_after,
+        retry=retry_if_exception(_is_retryable),
+        reraise=True
+    )
+    def _execute_search(self, query_text, filter_condition, top):
+        """Runs one search request, retried with backoff on throttling and transient server errors."""
+        # Results are fetched lazily, so the request and the iteration both hold the slot
+        with _search_slots:
             # Use semantic search with vector capabilities if available
             results = self.search_client.search(
                 search_text=query_text,
@@ -51,6 +157,8 @@ class AzureSearchService:
                 query_language="en-us",
                 semantic_configuration_name="default",
                 filter=filter_condition,
+                select=SEARCH_SELECT_FIELDS,
+                search_fields=SEARCH_TEXT_FIELDS,
                 top=top,
                 include_total_count=True
             )
@@ -74,9 +182,6 @@ class AzureSearchService:
                 "count": results.get_count(),
                 "results": search_results
             }
-        except Exception as e:
-            print(f"Error searching documents: {e}")
-            raise
 
     def get_document_by_id(self, document_id):
         """Get a document by its ID.
@@ -1,13 +1,120 @@
 # backend/sharepoint_service.py
 
 import os
+import time
+import atexit
+import logging
+import base64
+import shutil
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import quote, urlparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 import requests
-from azure.identity import DefaultAzureCredential
-import msal
+from requests.auth import AuthBase
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Error bodies from Graph (sometimes full HTML pages) are truncated to this many characters
+MAX_LOGGED_RESPONSE_CHARS = 512
+
+# Client-credentials tokens are fetched with a direct call to the token endpoint; set
+# SHAREPOINT_USE_MSAL=true to acquire them through MSAL instead
+SHAREPOINT_USE_MSAL = os.getenv("SHAREPOINT_USE_MSAL", "false").lower() == "true"
+GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+
+# Cached Graph tokens are refreshed this long before they expire
+TOKEN_REFRESH_MARGIN_SECONDS = 60
+
+# (connect, read) timeouts for Graph API requests
+GRAPH_TIMEOUT = (5, 30)
+GRAPH_DOWNLOAD_TIMEOUT = (5, 300)
+
+# Graph JSON batching accepts at most 20 sub-requests per $batch call; content responses
+# count against the batch payload size, so content batches are kept much smaller
+GRAPH_BATCH_MAX_REQUESTS = 20
+GRAPH_CONTENT_BATCH_MAX_REQUESTS = 4
+
+# Folder listings ask for the largest page Graph allows and only the fields callers use
+GRAPH_LIST_QUERY = "?$select=id,name,size,lastModifiedDateTime,file,folder,webUrl&$top=999"
+
+# Maximum number of concurrent downloads issued by download_many
+GRAPH_DOWNLOAD_CONCURRENCY = int(os.getenv("GRAPH_DOWNLOAD_CONCURRENCY", "16"))
+
+# Throttling protection: cap in-flight Graph requests per service, and when Graph answers 429
+# or 503 pause every thread for the Retry-After interval instead of letting each back off on its own
+GRAPH_MAX_INFLIGHT = int(os.getenv("GRAPH_MAX_INFLIGHT", "16"))
+GRAPH_THROTTLED_STATUS_CODES = (429, 503)
+GRAPH_THROTTLE_RETRIES = 3
+MAX_RETRY_AFTER_SECONDS = 30
+
+# Conditional GETs: the last ETag and body per URL are kept in an LRU, so an unchanged folder
+# page or file costs a 304 with no payload. Bodies held in memory and on disk are capped in
+# total; a download larger than the per-body memory limit is spilled to disk as it streams,
+# and one larger than the per-file limit is not cached at all
+GRAPH_ETAG_CACHE_SIZE = 256
+GRAPH_ETAG_CACHE_MAX_BYTES = 32 << 20
+GRAPH_ETAG_MEMORY_MAX_BYTES = 1 << 20
+GRAPH_ETAG_DISK_MAX_BYTES = 256 << 20
+GRAPH_ETAG_FILE_MAX_BYTES = 64 << 20
+
+class _BearerAuth(AuthBase):
+    """Adds the cached Graph bearer token to requests sent to the Graph endpoint.
+    
+    Other hosts (the token endpoint, pre-authenticated download URLs) are left untouched,
+    so fetching a token never recurses into this hook.
+    """
+    
+    def __init__(self, token_getter, endpoint):
+        self._token_getter = token_getter
+        self._endpoint = endpoint
+    
+    def __call__(self, r):
+        if r.url.startswith(self._endpoint):
+            token = self._token_getter()
+            if not token:
+                raise RuntimeError("Could not acquire a Graph access token")
+            r.headers["Authorization"] = f"Bearer {token}"
+        return r
+
+@dataclass(frozen=True)
+class SharePointConfig:
+    """Connection settings for SharePointService."""
+    tenant_id: Optional[str] = None
+    client_id: Optional[str] = None
+    client_secret: Optional[str] = None
+    sharepoint_site_url: Optional[str] = None
+    sharepoint_site_name: Optional[str] = None
+    document_library: Optional[str] = None
+    
+    @classmethod
+    def from_env(cls):
+        """Read the settings from environment variables.
+        
+        Returns:
+            A SharePointConfig.
+        """
+        return cls(
+            tenant_id=os.getenv("AZURE_TENANT_ID"),
+            client_id=os.getenv("AZURE_CLIENT_ID"),
+            client_secret=os.getenv("AZURE_CLIENT_SECRET"),
+            sharepoint_site_url=os.getenv("SHAREPOINT_SITE_URL"),
+            sharepoint_site_name=os.getenv("SHAREPOINT_SITE_NAME"),
+            document_library=os.getenv("SHAREPOINT_DOCUMENT_LIBRARY")
+        )
+
+# Environment configuration, read once at import time
+_CONFIG = SharePointConfig.from_env()
 
 class SharePointService:
     def __init__(self, tenant_id=None, client_id=None, client_secret=None, 
-                 sharepoint_site_url=None, sharepoint_site_name=None, document_library=None):
+                 sharepoint_site_url=None, sharepoint_site_name=None, document_library=None, config=None):
         """Initialize the SharePoint service.
         
         Args:
@@ -15,53 +122,415 @@ class SharePointService:
             client_id: The Azure client ID.
             client_secret: The Azure client secret.
             sharepoint_site_url: The SharePoint site URL.
-            sharepoint_site_name: The SharePoint site name.
+            sharepoint_site_name: The SharePoint site name. Optional and unused: the site is
+                resolved from sharepoint_site_url; kept for existing callers.
             document_library: The document library name.
+            config: The SharePointConfig supplying any setting not passed explicitly;
+                defaults to the environment configuration.
         """
-        # These would typically come from environment variables in production
-        self.tenant_id = tenant_id or os.getenv("AZURE_TENANT_ID")
-        self.client_id = client_id or os.getenv("AZURE_CLIENT_ID")
-        self.client_secret = client_secret or os.getenv("AZURE_CLIENT_SECRET")
-        self.sharepoint_site_url = sharepoint_site_url or os.getenv("SHAREPOINT_SITE_URL")
-        self.sharepoint_site_name = sharepoint_site_name or os.getenv("SHAREPOINT_SITE_NAME")
-        self.document_library = document_library or os.getenv("SHAREPOINT_DOCUMENT_LIBRARY")
+        config = config or _CONFIG
+        self.tenant_id = tenant_id or config.tenant_id
+        self.client_id = client_id or config.client_id
+        self.client_secret = client_secret or config.client_secret
+        self.sharepoint_site_url = sharepoint_site_url or config.sharepoint_site_url
+        self.sharepoint_site_name = sharepoint_site_name or config.sharepoint_site_name
+        self.document_library = document_library or config.document_library
         
-        if not all([self.tenant_id, self.client_id, self.client_secret, 
-                   self.sharepoint_site_url, self.sharepoint_site_name]):
+        if not all([self.tenant_id, self.client_id, self.client_secret, self.sharepoint_site_url]):
             raise ValueError("Missing required SharePoint configuration")
         
         # Microsoft Graph API endpoint
         self.graph_api_endpoint = "https://graph.microsoft.com/v1.0"
         
-        # Initialize the MSAL app
-        self.app = msal.ConfidentialClientApplication(
-            client_id=self.client_id,
-            client_credential=self.client_secret,
-            authority=f"https://login.microsoftonline.com/{self.tenant_id}"
+        # Site and drive ids are resolved from the configured names on first use, after which
+        # the drive root is kept relative to the endpoint (as $batch expects) and absolute
+        self._site_id = None
+        self._drive_id = None
+        self._drive_path_resolved = None
+        self._drive_root_resolved = None
+        self._root_children_url_resolved = None
+        self._ids_lock = threading.Lock()
+        
+        # OAuth 2.0 endpoints; the MSAL app is only created if SHAREPOINT_USE_MSAL is set
+        self.authority = f"https://login.microsoftonline.com/{self.tenant_id}"
+        self.token_endpoint = f"{self.authority}/oauth2/v2.0/token"
+        self.app = None
+        
+        # Cached Graph token; tokens are valid for about an hour, so a new one is only fetched on expiry
+        self._token = None
+        self._token_expiry = 0.0
+        self._token_lock = threading.Lock()
+        
+        # Pooled session, so repeated Graph calls reuse the TCP and TLS connection
+        self.session = requests.Session()
+        # Only idempotent reads are retried here; the $batch and token POSTs are never replayed.
+        # 429 and 503 carry Retry-After and are left to _graph_request, which caps the wait
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=50,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                backoff_jitter=0.5,
+                status_forcelist=[500, 502, 504],
+                respect_retry_after_header=False,
+                allowed_methods=frozenset(["GET", "HEAD"])
+            )
         )
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip"})
+        self.session.auth = _BearerAuth(self.get_access_token, self.graph_api_endpoint)
+        
+        # 429s and 503s are handled by _graph_request rather than the adapter, so one throttle pauses
+        # all threads and no thread sleeps while holding an in-flight slot
+        self._inflight = threading.BoundedSemaphore(GRAPH_MAX_INFLIGHT)
+        self._throttled_until = 0.0
+        
+        # url -> (etag, body, size); body is parsed JSON, bytes, or the path of a file in _etag_dir,
+        # and size is its length in bytes, counted in _etag_bytes or _etag_disk_bytes
+        self._etag_cache = OrderedDict()
+        self._etag_bytes = 0
+        self._etag_disk_bytes = 0
+        self._etag_lock = threading.Lock()
+        self._etag_dir = None
+    
+    def close(self):
+        """Close the pooled HTTP session and drop the ETag cache."""
+        self.session.close()
+        with self._etag_lock:
+            self._etag_cache.clear()
+            self._etag_bytes = 0
+            self._etag_disk_bytes = 0
+            if self._etag_dir is not None:
+                shutil.rmtree(self._etag_dir, ignore_errors=True)
+                self._etag_dir = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _graph_request(self, method, url, **kwargs):
+        """Send a Graph request within the in-flight cap, waiting out any shared throttle pause.
+        
+        Args:
+            method: The HTTP method.
+            url: The request URL.
+            **kwargs: Passed through to requests.Session.request.
+            
+        Returns:
+            The response; a 429 or 503 is only returned once GRAPH_THROTTLE_RETRIES are exhausted.
+        """
+        for attempt in range(GRAPH_THROTTLE_RETRIES + 1):
+            pause = self._throttled_until - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+            with self._inflight:
+                response = self.session.request(method, url, **kwargs)
+            if response.status_code not in GRAPH_THROTTLED_STATUS_CODES or attempt == GRAPH_THROTTLE_RETRIES:
+                return response
+            
+            try:
+                retry_after = min(float(response.headers.get("Retry-After", 1)), MAX_RETRY_AFTER_SECONDS)
+            except ValueError:
+                retry_after = 1.0
+            logger.warning("Graph throttled the request (%s), pausing for %s seconds", response.status_code, retry_after)
+            response.close()
+            self._throttled_until = max(self._throttled_until, time.monotonic() + retry_after)
+    
+    def _etag_get(self, url):
+        """Returns the cached (etag, body, size) for a URL, or None."""
+        with self._etag_lock:
+            entry = self._etag_cache.get(url)
+            if entry is not None:
+                self._etag_cache.move_to_end(url)
+            return entry
+    
+    def _etag_put(self, url, etag, body, size):
+        """Caches the body last returned for a URL under its ETag, evicting the oldest entries.
+        
+        Args:
+            url: The request URL.
+            etag: The ETag returned with the body.
+            body: Parsed JSON, bytes, or the path of a file in _etag_dir.
+            size: The length of the body in bytes.
+        """
+        with self._etag_lock:
+            evicted = []
+            previous = self._etag_cache.pop(url, None)
+            if previous is not None:
+                self._etag_account(previous, -1)
+                evicted.append(previous)
+            self._etag_cache[url] = (etag, body, size)
+            self._etag_account(self._etag_cache[url], 1)
+            while (len(self._etag_cache) > GRAPH_ETAG_CACHE_SIZE
+                   or self._etag_bytes > GRAPH_ETAG_CACHE_MAX_BYTES
+                   or self._etag_disk_bytes > GRAPH_ETAG_DISK_MAX_BYTES):
+                old_entry = self._etag_cache.popitem(last=False)[1]
+                self._etag_account(old_entry, -1)
+                evicted.append(old_entry)
+        for _, old_body, _ in evicted:
+            if isinstance(old_body, str):
+                try:
+                    os.remove(old_body)
+                except OSError:
+                    pass
+    
+    def _etag_account(self, entry, sign):
+        """Adds (sign=1) or removes (sign=-1) an entry's size from the memory or disk total."""
+        if isinstance(entry[1], str):
+            self._etag_disk_bytes += sign * entry[2]
+        else:
+            self._etag_bytes += sign * entry[2]
+    
+    def _etag_tempfile(self):
+        """Creates a file in the ETag cache directory for a large body; returns (fd, path)."""
+        with self._etag_lock:
+            if self._etag_dir is None:
+                self._etag_dir = tempfile.mkdtemp(prefix="sharepoint-cache-")
+                # close() is not reached when a worker exits, so the directory is removed then too
+                atexit.register(shutil.rmtree, self._etag_dir, ignore_errors=True)
+            cache_dir = self._etag_dir
+        return tempfile.mkstemp(dir=cache_dir)
     
     def get_access_token(self):
         """Get an access token for the Microsoft Graph API.
         
+        The token is cached and reused until TOKEN_REFRESH_MARGIN_SECONDS before it expires.
+        
         Returns:
             The access token if successful, None otherwise.
         """
+        if self._token and time.monotonic() < self._token_expiry - TOKEN_REFRESH_MARGIN_SECONDS:
+            return self._token
         try:
-            # Acquire token for Microsoft Graph API
-            scopes = ["https://graph.microsoft.com/.default"]
-            result = self.app.acquire_token_for_client(scopes=scopes)
+            # One thread refreshes the token while the others wait for it
+            with self._token_lock:
+                if self._token and time.monotonic() < self._token_expiry - TOKEN_REFRESH_MARGIN_SECONDS:
+                    return self._token
+                
+                # Acquire token for Microsoft Graph API
+                if SHAREPOINT_USE_MSAL:
+                    result = self._fetch_token_msal()
+                else:
+                    result = self._fetch_token_direct()
+                
+                if "access_token" in result:
+                    self._token = result["access_token"]
+                    self._token_expiry = time.monotonic() + int(result.get("expires_in", 3600))
+                    return self._token
+            
+            logger.error("Error acquiring token: %s (%s)", result.get("error"), result.get("error_description"))
+            return None
+        except Exception as e:
+            logger.error("Error getting access token: %s", e)
+            return None
+    
+    def _fetch_token_direct(self):
+        """Request a client-credentials token straight from the token endpoint.
+        
+        Returns:
+            The token endpoint's JSON response, which has the same "access_token",
+            "expires_in" and "error" fields as an MSAL result.
+        """
+        response = self.session.post(
+            self.token_endpoint,
+            data={
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "scope": GRAPH_SCOPE,
+                "grant_type": "client_credentials"
+            },
+            timeout=GRAPH_TIMEOUT
+        )
+        return orjson.loads(response.content)
+    
+    def _fetch_token_msal(self):
+        """Request a client-credentials token through MSAL, creating the app on first use.
+        
+        Returns:
+            The MSAL result dictionary.
+        """
+        if self.app is None:
+            import msal
+            self.app = msal.ConfidentialClientApplication(
+                client_id=self.client_id,
+                client_credential=self.client_secret,
+                authority=self.authority
+            )
+        return self.app.acquire_token_for_client(scopes=[GRAPH_SCOPE])
+    
+    def _resolve_ids(self):
+        """Resolve the site id and drive id once, so Graph never has to look them up by name.
+        
+        The site is resolved from the hostname and path of the site URL, and the drive by
+        matching the document library name (a value that is already a drive id is used
+        as is; without a library the site's default drive is used).
+        
+        Raises:
+            RuntimeError: If no access token could be acquired or the library was not found.
+            requests.HTTPError: If a lookup request failed.
+        """
+        with self._ids_lock:
+            if self._drive_id is not None:
+                return
+            site_url = urlparse(self.sharepoint_site_url)
+            site_path = site_url.path.rstrip("/")
+            site_lookup = f"{self.graph_api_endpoint}/sites/{site_url.hostname}"
+            if site_path:
+                site_lookup += f":{quote(site_path, safe='/')}"
+            response = self._graph_request("GET", site_lookup, params={"$select": "id"}, timeout=GRAPH_TIMEOUT)
+            response.raise_for_status()
+            site_id = orjson.loads(response.content)["id"]
             
-            if "access_token" in result:
-                return result["access_token"]
+            if not self.document_library:
+                drive_lookup = f"{self.graph_api_endpoint}/sites/{site_id}/drive"
+                response = self._graph_request("GET", drive_lookup, params={"$select": "id"}, timeout=GRAPH_TIMEOUT)
+                response.raise_for_status()
+                drive_id = orjson.loads(response.content)["id"]
+            elif self.document_library.startswith("b!"):
+                drive_id = self.document_library
             else:
-                print(f"Error acquiring token: {result.get('error')}")
-                print(f"Error description: {result.get('error_description')}")
-                return None
+                drive_lookup = f"{self.graph_api_endpoint}/sites/{site_id}/drives"
+                response = self._graph_request("GET", drive_lookup, params={"$select": "id,name"}, timeout=GRAPH_TIMEOUT)
+                response.raise_for_status()
+                drives = orjson.loads(response.content).get("value", [])
+                drive_id = next((d["id"] for d in drives if d.get("name") == self.document_library), None)
+                if drive_id is None:
+                    raise RuntimeError(f"Document library '{self.document_library}' not found")
+            
+            self._site_id = site_id
+            self._drive_path_resolved = f"/drives/{drive_id}/root"
+            self._drive_root_resolved = self.graph_api_endpoint + self._drive_path_resolved
+            self._root_children_url_resolved = self._drive_root_resolved + self._children_suffix("")
+            self._drive_id = drive_id
+    
+    @property
+    def _drive_path(self):
+        """The drive root path relative to the Graph endpoint."""
+        if self._drive_id is None:
+            self._resolve_ids()
+        return self._drive_path_resolved
+    
+    @property
+    def _drive_root(self):
+        """The absolute drive root URL."""
+        if self._drive_id is None:
+            self._resolve_ids()
+        return self._drive_root_resolved
+    
+    @property
+    def _root_children_url(self):
+        """The complete URL that lists the library root, the most common listing."""
+        if self._drive_id is None:
+            self._resolve_ids()
+        return self._root_children_url_resolved
+    
+    @staticmethod
+    def _children_suffix(folder_path):
+        """Returns the URL suffix, relative to the drive root, that lists a folder's children."""
+        folder_path = folder_path.strip("/")
+        if folder_path:
+            return f":/{quote(folder_path, safe='/')}:/children{GRAPH_LIST_QUERY}"
+        return "/children" + GRAPH_LIST_QUERY
+    
+    @staticmethod
+    def _content_suffix(file_path):
+        """Returns the URL suffix, relative to the drive root, that downloads a file."""
+        return f":/{quote(file_path.strip('/'), safe='/')}:/content"
+    
+    def _post_batch(self, urls):
+        """Sends GET requests for the given relative URLs in a single $batch call.
+        
+        Args:
+            urls: Up to GRAPH_BATCH_MAX_REQUESTS Graph paths relative to the API endpoint.
+            
+        Returns:
+            The sub-responses, ordered like the input URLs.
+        """
+        payload = {
+            "requests": [
+                {"id": str(i), "method": "GET", "url": url}
+                for i, url in enumerate(urls)
+            ]
+        }
+        response = self._graph_request("POST", f"{self.graph_api_endpoint}/$batch", data=orjson.dumps(payload),
+                                       headers={"Content-Type": "application/json"}, timeout=GRAPH_TIMEOUT)
+        response.raise_for_status()
+        # Sub-responses may come back in any order
+        return sorted(orjson.loads(response.content).get("responses", []), key=lambda r: int(r["id"]))
+    
+    def _iter_pages(self, url):
+        """Yields the items of a Graph collection page by page, following @odata.nextLink.
+        
+        Raises:
+            requests.HTTPError: If a page could not be fetched.
+        """
+        while url:
+            cached = self._etag_get(url)
+            headers = {"If-None-Match": cached[0]} if cached is not None else None
+            response = self._graph_request("GET", url, headers=headers, timeout=GRAPH_TIMEOUT)
+            if response.status_code == 304 and cached is not None:
+                data = cached[1]
+            elif response.status_code == 200:
+                data = orjson.loads(response.content)
+                etag = response.headers.get("ETag")
+                if etag:
+                    self._etag_put(url, etag, data, len(response.content))
+            else:
+                logger.error("Error listing documents: %s %s", response.status_code,
+                             response.text[:MAX_LOGGED_RESPONSE_CHARS])
+                raise requests.HTTPError(f"Listing failed with status {response.status_code}", response=response)
+            yield data.get("value", [])
+            url = data.get("@odata.nextLink")
+    
+    def iter_documents(self, folder_path=""):
+        """Iterate over the documents in a SharePoint folder, one page at a time.
+        
+        Items are yielded as each page arrives, so large libraries can be processed
+        without holding the full listing in memory.
+        
+        Args:
+            folder_path: The path to the folder within the document library.
+            
+        Yields:
+            The documents in the folder.
+            
+        Raises:
+            RuntimeError: If no access token could be acquired.
+            requests.HTTPError: If a page could not be fetched.
+        """
+        # Construct the API URL
+        api_url = self._drive_root + self._children_suffix(folder_path)
+        for page in self._iter_pages(api_url):
+            yield from page
+    
+    def _paged_get(self, url):
+        """Fetch every item of a Graph collection, following @odata.nextLink.
+        
+        Raises:
+            RuntimeError: If no access token could be acquired.
+            requests.HTTPError: If a page could not be fetched.
+        """
+        items = []
+        for page in self._iter_pages(url):
+            items.extend(page)
+        return items
+    
+    def list_root(self):
+        """List documents at the root of the document library.
+        
+        Returns:
+            A list of documents if successful, None otherwise.
+        """
+        try:
+            return self._paged_get(self._root_children_url)
         except Exception as e:
-            print(f"Error getting access token: {e}")
+            logger.error("Error listing documents: %s", e)
             return None
     
-    def list_documents(self, folder_path=""):
+    def list_folder(self, folder_path):
         """List documents in a SharePoint folder.
         
         Args:
@@ -71,37 +540,120 @@ class SharePointService:
             A list of documents if successful, None otherwise.
         """
         try:
-            access_token = self.get_access_token()
-            if not access_token:
-                return None
-            
-            # Construct the API URL
-            folder_path = folder_path.strip("/")
-            if folder_path:
-                api_url = f"{self.graph_api_endpoint}/sites/{self.sharepoint_site_name}/drives/{self.document_library}/root:/{folder_path}:/children"
-            else:
-                api_url = f"{self.graph_api_endpoint}/sites/{self.sharepoint_site_name}/drives/{self.document_library}/root/children"
+            return self._paged_get(self._drive_root + self._children_suffix(folder_path))
+        except Exception as e:
+            logger.error("Error listing documents: %s", e)
+            return None
+    
+    def list_documents(self, folder_path=""):
+        """List documents in a SharePoint folder, or at the library root if no path is given.
+        
+        Every page of the listing is fetched, not only the first.
+        
+        Args:
+            folder_path: The path to the folder within the document library.
+            
+        Returns:
+            A list of documents if successful, None otherwise.
+        """
+        if folder_path.strip("/"):
+            return self.list_folder(folder_path)
+        return self.list_root()
+    
+    def iter_document_content(self, file_path, chunk_size=1 << 20):
+        """Stream the content of a document from SharePoint in chunks.
+        
+        The body is never held in memory as a whole, so callers can write it to disk or
+        pass the iterator straight to an upload.
+        
+        Args:
+            file_path: The path to the file within the document library.
+            chunk_size: The size in bytes of each chunk.
             
-            # Make the API request
-            headers = {
-                "Authorization": f"Bearer {access_token}",
-                "Accept": "application/json"
-            }
-            response = requests.get(api_url, headers=headers)
+        Yields:
+            Chunks of the document content.
             
-            if response.status_code == 200:
-                return response.json().get("value", [])
+        Raises:
+            RuntimeError: If no access token could be acquired.
+            requests.HTTPError: If the download failed.
+        """
+        # Construct the API URL
+        api_url = self._drive_root + self._content_suffix(file_path)
+        
+        # Make the API request; large files get a longer read timeout
+        cached = self._etag_get(api_url)
+        headers = {"If-None-Match": cached[0]} if cached is not None else None
+        response = self._graph_request("GET", api_url, headers=headers, stream=True, timeout=GRAPH_DOWNLOAD_TIMEOUT)
+        with response:
+            if response.status_code == 304 and cached is not None:
+                yield from self._iter_cached_content(cached[1], chunk_size)
+                return
+            if response.status_code != 200:
+                logger.error("Error getting document content: %s %s", response.status_code,
+                             response.text[:MAX_LOGGED_RESPONSE_CHARS])
+                raise requests.HTTPError(f"Download failed with status {response.status_code}", response=response)
+            
+            etag = response.headers.get("ETag")
+            if not etag:
+                yield from response.iter_content(chunk_size)
+                return
+            
+            # Keep the body for the next conditional GET as it streams: small bodies stay in
+            # memory, one that outgrows GRAPH_ETAG_MEMORY_MAX_BYTES moves to a file on disk,
+            # and one that outgrows GRAPH_ETAG_FILE_MAX_BYTES is only streamed
+            chunks = []
+            size = 0
+            keep = True
+            cache_file = None
+            completed = False
+            try:
+                for chunk in response.iter_content(chunk_size):
+                    size += len(chunk)
+                    if keep and size > GRAPH_ETAG_FILE_MAX_BYTES:
+                        keep = False
+                        chunks = None
+                    elif keep and cache_file is None and size > GRAPH_ETAG_MEMORY_MAX_BYTES:
+                        fd, cache_path = self._etag_tempfile()
+                        cache_file = os.fdopen(fd, "wb")
+                        cache_file.writelines(chunks)
+                        chunks = None
+                    if keep and cache_file is not None:
+                        cache_file.write(chunk)
+                    elif keep:
+                        chunks.append(chunk)
+                    yield chunk
+                completed = True
+            finally:
+                if cache_file is not None:
+                    cache_file.close()
+                    if not (completed and keep):
+                        os.remove(cache_path)
+            if not keep:
+                return
+            if cache_file is None:
+                self._etag_put(api_url, etag, b"".join(chunks), size)
             else:
-                print(f"Error listing documents: {response.status_code}")
-                print(f"Response: {response.text}")
-                return None
-        except Exception as e:
-            print(f"Error listing documents: {e}")
-            return None
+                self._etag_put(api_url, etag, cache_path, size)
+    
+    @staticmethod
+    def _iter_cached_content(body, chunk_size):
+        """Yields a cached document body, held either in memory or in a file on disk."""
+        if isinstance(body, bytes):
+            for start in range(0, len(body), chunk_size):
+                yield body[start:start + chunk_size]
+            return
+        with open(body, "rb") as cache_file:
+            while True:
+                chunk = cache_file.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
     
     def get_document_content(self, file_path):
         """Get the content of a document from SharePoint.
         
+        Prefer iter_document_content when the bytes do not need to be in memory at once.
+        
         Args:
             file_path: The path to the file within the document library.
             
@@ -109,48 +661,151 @@ class SharePointService:
             The document content if successful, None otherwise.
         """
         try:
-            access_token = self.get_access_token()
-            if not access_token:
-                return None
-            
-            # Construct the API URL
-            file_path = file_path.strip("/")
-            api_url = f"{self.graph_api_endpoint}/sites/{self.sharepoint_site_name}/drives/{self.document_library}/root:/{file_path}:/content"
-            
-            # Make the API request
-            headers = {
-                "Authorization": f"Bearer {access_token}"
-            }
-            response = requests.get(api_url, headers=headers)
+            return b"".join(self.iter_document_content(file_path))
+        except Exception as e:
+            logger.error("Error getting document content: %s", e)
+            return None
+    
+    def download_many(self, file_paths):
+        """Download several documents from SharePoint concurrently.
+        
+        Downloads overlap on a thread pool of up to GRAPH_DOWNLOAD_CONCURRENCY workers
+        sharing the pooled session and the cached token, so wall-clock time approaches
+        that of the slowest download rather than the sum of all of them.
+        
+        Args:
+            file_paths: The paths to the files within the document library.
             
+        Returns:
+            A list with, for each file path, the document content or None on error.
+        """
+        if not file_paths:
+            return []
+        # Acquire the token once up front so the workers all hit the cache
+        if not self.get_access_token():
+            return [None] * len(file_paths)
+        return self._map_downloads(self.get_document_content, file_paths)
+    
+    @staticmethod
+    def _map_downloads(download, items):
+        """Runs download over items on up to GRAPH_DOWNLOAD_CONCURRENCY threads, keeping their order."""
+        if not items:
+            return []
+        max_workers = min(GRAPH_DOWNLOAD_CONCURRENCY, len(items))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sharepoint-download") as pool:
+            return list(pool.map(download, items))
+    
+    def _download_location(self, location):
+        """Fetch a pre-authenticated download URL returned by a $batch content request.
+        
+        Returns:
+            The document content if successful, None otherwise.
+        """
+        try:
+            response = self._graph_request("GET", location, timeout=GRAPH_DOWNLOAD_TIMEOUT)
             if response.status_code == 200:
                 return response.content
-            else:
-                print(f"Error getting document content: {response.status_code}")
-                print(f"Response: {response.text}")
-                return None
+            logger.error("Error downloading document content: %s", response.status_code)
         except Exception as e:
-            print(f"Error getting document content: {e}")
+            logger.error("Error downloading document content: %s", e)
+        return None
+    
+    def list_documents_batch(self, folder_paths):
+        """List documents in several SharePoint folders using Graph JSON batching.
+        
+        Folders are listed GRAPH_BATCH_MAX_REQUESTS at a time, so N folders cost
+        ceil(N / 20) round-trips instead of N. A malformed path fails only its own
+        sub-request with a 4xx status, so paths should be validated before batching.
+        
+        Args:
+            folder_paths: The paths to the folders within the document library.
+            
+        Returns:
+            A list with, for each folder path, a list of documents or None on error.
+            None if the token could not be acquired or a batch request failed.
+        """
+        try:
+            results = []
+            for start in range(0, len(folder_paths), GRAPH_BATCH_MAX_REQUESTS):
+                chunk = folder_paths[start:start + GRAPH_BATCH_MAX_REQUESTS]
+                responses = self._post_batch([self._drive_path + self._children_suffix(p) for p in chunk])
+                for folder_path, sub_response in zip(chunk, responses):
+                    if sub_response.get("status") == 200:
+                        body = sub_response.get("body", {})
+                        documents = body.get("value", [])
+                        # Folders larger than one page continue outside the batch
+                        next_link = body.get("@odata.nextLink")
+                        if next_link:
+                            for page in self._iter_pages(next_link):
+                                documents.extend(page)
+                        results.append(documents)
+                    else:
+                        logger.error("Error listing documents in '%s': %s", folder_path, sub_response.get("status"))
+                        results.append(None)
+            return results
+        except Exception as e:
+            logger.error("Error listing documents in batch: %s", e)
+            return None
+    
+    def get_documents_content_batch(self, file_paths):
+        """Get the content of several documents using Graph JSON batching.
+        
+        Content sub-requests count against the batch size limit, so only
+        GRAPH_CONTENT_BATCH_MAX_REQUESTS files are requested per batch. Graph answers
+        most of them with a 302 to a pre-authenticated download URL; once every batch
+        has been sent, those URLs are fetched concurrently as in download_many.
+        
+        Args:
+            file_paths: The paths to the files within the document library.
+            
+        Returns:
+            A list with, for each file path, the document content or None on error.
+            None if the token could not be acquired or a batch request failed.
+        """
+        try:
+            results = []
+            redirects = []
+            for start in range(0, len(file_paths), GRAPH_CONTENT_BATCH_MAX_REQUESTS):
+                chunk = file_paths[start:start + GRAPH_CONTENT_BATCH_MAX_REQUESTS]
+                responses = self._post_batch([self._drive_path + self._content_suffix(p) for p in chunk])
+                for file_path, sub_response in zip(chunk, responses):
+                    status = sub_response.get("status")
+                    if status == 302:
+                        # The download URL is pre-authenticated and must not carry the bearer token
+                        redirects.append((len(results), sub_response.get("headers", {}).get("Location")))
+                        results.append(None)
+                    elif status == 200:
+                        # Binary bodies are returned base64-encoded inside the batch response
+                        results.append(base64.b64decode(sub_response.get("body", "")))
+                    else:
+                        logger.error("Error getting document content for '%s': %s", file_path, status)
+                        results.append(None)
+            
+            contents = self._map_downloads(self._download_location, [location for _, location in redirects])
+            for (index, _), content in zip(redirects, contents):
+                results[index] = content
+            return results
+        except Exception as e:
+            logger.error("Error getting document content in batch: %s", e)
             return None
 
 # Example usage (for testing purposes)
 if __name__ == "__main__":
     try:
         # This requires environment variables to be set
-        sharepoint_service = SharePointService()
-        
-        # Example: List documents in a folder
-        documents = sharepoint_service.list_documents("DDQ Documents")
-        
-        if documents:
-            print(f"Found {len(documents)} documents:")
-            for doc in documents:
-                print(f"Name: {doc.get('name')}")
-                print(f"Type: {doc.get('file', {}).get('mimeType', 'Folder')}")
-                print(f"Last Modified: {doc.get('lastModifiedDateTime')}")
-                print()
-        else:
-            print("No documents found or error occurred.")
+        with SharePointService() as sharepoint_service:
+            # Example: List documents in a folder
+            documents = sharepoint_service.list_documents("DDQ Documents")
+            
+            if documents:
+                print(f"Found {len(documents)} documents:")
+                for doc in documents:
+                    print(f"Name: {doc.get('name')}")
+                    print(f"Type: {doc.get('file', {}).get('mimeType', 'Folder')}")
+                    print(f"Last Modified: {doc.get('lastModifiedDateTime')}")
+                    print()
+            else:
+                print("No documents found or error occurred.")
     except Exception as e:
         print(f"Failed to list documents: {e}")
         print("Please ensure SharePoint environment variables are set.")
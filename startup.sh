@@ -5,5 +5,5 @@ set -e
 pip install --upgrade pip
 pip install -r requirements.txt
 
-# Start the Flask app using gunicorn
-exec gunicorn -k gthread -w 4 -b 0.0.0.0:${PORT:-8000} app:app 
\ No newline at end of file
+# Start the Flask app using gunicorn (workers, threads and preloading are set in gunicorn.conf.py)
+exec gunicorn -c gunicorn.conf.py app:app 
\ No newline at end of file
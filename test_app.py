@@ -1,55 +1,66 @@
 # backend/test_app.py
 
 import unittest
-import json
+import orjson
 import os
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, DEFAULT
 from app import app
 
+# Search results shared by the tests that exercise retrieval
+MOCK_SEARCH_RESULTS = {
+    "count": 1,
+    "results": [
+        {
+            "id": "doc1",
+            "title": "ESG Policy",
+            "content": "Our ESG policy emphasizes responsible investment.",
+            "source": "ESG Policy",
+            "sourceFile": "ESG_Policy.pdf",
+            "score": 0.95
+        }
+    ]
+}
+
+# The services every chat test replaces
+patch_chat_services = patch.multiple('app', search_service=DEFAULT, get_openai_completion=DEFAULT, blob_service=DEFAULT)
+
 class TestDDQChatApp(unittest.TestCase):
     """Test cases for the DDQ Chat App Flask application."""
     
-    def setUp(self):
-        """Set up test client and other test variables."""
-        self.app = app.test_client()
-        self.app.testing = True
+    @classmethod
+    def setUpClass(cls):
+        """Set up the shared test client and replace the SharePoint service so no test reaches Graph."""
+        cls.client = app.test_client()
+        cls.client.testing = True
+        cls.sharepoint_patcher = patch('app.sharepoint_service')
+        cls.mock_sharepoint_service = cls.sharepoint_patcher.start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.sharepoint_patcher.stop()
     
     def test_health_check(self):
         """Test the health check endpoint."""
-        response = self.app.get('/health')
+        response = self.client.get('/health')
         self.assertEqual(response.status_code, 200)
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         self.assertEqual(data['status'], 'ok')
     
-    @patch('app.search_service')
-    @patch('app.get_openai_completion')
-    @patch('app.blob_service')
-    def test_chat_endpoint(self, mock_blob_service, mock_get_openai_completion, mock_search_service):
+    @patch('app.INLINE_DOCUMENT_MAX_BYTES', 0)
+    @patch_chat_services
+    def test_chat_endpoint(self, search_service, get_openai_completion, blob_service):
         """Test the chat endpoint with mocked services."""
         # Mock search service response
-        mock_search_results = {
-            "count": 1,
-            "results": [
-                {
-                    "id": "doc1",
-                    "title": "ESG Policy",
-                    "content": "Our ESG policy emphasizes responsible investment.",
-                    "source": "ESG Policy",
-                    "sourceFile": "ESG_Policy.pdf",
-                    "score": 0.95
-                }
-            ]
-        }
-        mock_search_service.search_documents.return_value = mock_search_results
+        search_service.search_documents.return_value = MOCK_SEARCH_RESULTS
         
         # Mock OpenAI response
         mock_completion = MagicMock()
         mock_completion.choices = [MagicMock()]
         mock_completion.choices[0].message.content = "Based on the ESG Policy, the fund emphasizes responsible investment."
-        mock_get_openai_completion.return_value = mock_completion
+        get_openai_completion.return_value = mock_completion
         
         # Mock blob service response
-        mock_blob_service.upload_document.return_value = "https://example.blob.core.windows.net/container/document.docx"
+        blob_service.upload_document.return_value = "https://example.blob.core.windows.net/container/document.docx"
         
         # Test data
         test_data = {
@@ -58,15 +69,15 @@ class TestDDQChatApp(unittest.TestCase):
         }
         
         # Make request
-        response = self.app.post(
+        response = self.client.post(
             '/api/chat',
-            data=json.dumps(test_data),
+            data=orjson.dumps(test_data),
             content_type='application/json'
         )
         
         # Assertions
         self.assertEqual(response.status_code, 200)
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         self.assertIn('ai_response', data)
         self.assertIn('document_url', data)
         self.assertIn('sources', data)
@@ -74,20 +85,210 @@ class TestDDQChatApp(unittest.TestCase):
         self.assertEqual(data['document_url'], "https://example.blob.core.windows.net/container/document.docx")
         self.assertEqual(data['sources'], ["ESG_Policy.pdf"])
     
+    @patch('app.INLINE_DOCUMENT_MAX_BYTES', 0)
+    @patch_chat_services
+    def test_chat_endpoint_streaming(self, search_service, get_openai_completion, blob_service):
+        """Test the chat endpoint streams completion deltas as Server-Sent Events."""
+        search_service.search_documents.return_value = {"count": 0, "results": []}
+
+        # Mock streamed OpenAI updates
+        mock_updates = []
+        for delta in ["The fund ", "emphasizes ESG."]:
+            update = MagicMock()
+            update.choices = [MagicMock()]
+            update.choices[0].delta.content = delta
+            mock_updates.append(update)
+        get_openai_completion.return_value = iter(mock_updates)
+
+        blob_service.upload_document.return_value = "https://example.blob.core.windows.net/container/document.docx"
+
+        response = self.client.post(
+            '/api/chat',
+            data=orjson.dumps({"prompt": "What is the fund's ESG policy?", "stream": True}),
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = [
+            orjson.loads(line[len("data: "):])
+            for line in response.get_data(as_text=True).split("\n\n") if line
+        ]
+        self.assertEqual([e["delta"] for e in events if "delta" in e], ["The fund ", "emphasizes ESG."])
+        self.assertEqual(events[-1]["document_url"], "https://example.blob.core.windows.net/container/document.docx")
+        get_openai_completion.assert_called_once()
+        self.assertTrue(get_openai_completion.call_args.kwargs["stream"])
+
+    @patch_chat_services
+    def test_chat_endpoint_inline_document(self, search_service, get_openai_completion, blob_service):
+        """Test that small documents are returned as a data URL without a blob upload."""
+        search_service.search_documents.return_value = {"count": 0, "results": []}
+        mock_completion = MagicMock()
+        mock_completion.choices = [MagicMock()]
+        mock_completion.choices[0].message.content = "Short answer."
+        get_openai_completion.return_value = mock_completion
+
+        response = self.client.post(
+            '/api/chat',
+            data=orjson.dumps({"prompt": "What is the fund's ESG policy?"}),
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Blob-Skipped'], 'true')
+        data = orjson.loads(response.data)
+        self.assertTrue(data['document_url'].startswith(
+            "data:application/vnd.openxmlformats-officedocument.wordprocessingml.document;base64,"
+        ))
+        blob_service.upload_document.assert_not_called()
+
+    @patch_chat_services
+    def test_chat_endpoint_conversational_prompt_skips_search(self, search_service, get_openai_completion, blob_service):
+        """Test that small-talk prompts are answered without querying the search index."""
+        mock_completion = MagicMock()
+        mock_completion.choices = [MagicMock()]
+        mock_completion.choices[0].message.content = "You're welcome."
+        get_openai_completion.return_value = mock_completion
+
+        response = self.client.post(
+            '/api/chat',
+            data=orjson.dumps({"prompt": "Thanks!"}),
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(orjson.loads(response.data)['sources'], [])
+        search_service.search_documents.assert_not_called()
+
+    @patch_chat_services
+    def test_chat_endpoint_questions_opening_with_small_talk_use_search(self, search_service, get_openai_completion, blob_service):
+        """Test that real questions are searched even when they start like small talk."""
+        search_service.search_documents.return_value = MOCK_SEARCH_RESULTS
+        mock_completion = MagicMock()
+        mock_completion.choices = [MagicMock()]
+        mock_completion.choices[0].message.content = "Answer."
+        get_openai_completion.return_value = mock_completion
+
+        for prompt in ["Hi, what's the fund AUM?", "Summarize the ESG policy", "ok what is your AUM"]:
+            with self.subTest(prompt=prompt):
+                search_service.search_documents.reset_mock()
+
+                response = self.client.post(
+                    '/api/chat',
+                    data=orjson.dumps({"prompt": prompt}),
+                    content_type='application/json'
+                )
+
+                self.assertEqual(response.status_code, 200)
+                search_service.search_documents.assert_called_once()
+                self.assertEqual(orjson.loads(response.data)['sources'], ["ESG_Policy.pdf"])
+
+    @patch('app.cache_service')
+    @patch('app.search_service')
+    @patch('app.get_openai_completion')
+    def test_chat_endpoint_cache_hit(self, mock_get_openai_completion, mock_search_service, mock_cache_service):
+        """Test that a cached response skips both search and the OpenAI call."""
+        cached_response = {
+            "ai_response": "Cached answer.",
+            "document_url": "https://example.blob.core.windows.net/container/document.docx",
+            "sources": ["ESG_Policy.pdf"]
+        }
+        mock_cache_service.get_chat.return_value = cached_response
+        mock_cache_service.get_search.return_value = None
+        mock_cache_service.semantic_enabled = False
+
+        response = self.client.post(
+            '/api/chat',
+            data=orjson.dumps({"prompt": "What is the fund's ESG policy?"}),
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Cache'], 'HIT')
+        self.assertEqual(orjson.loads(response.data), cached_response)
+        mock_search_service.search_documents.assert_not_called()
+        mock_cache_service.set_search.assert_not_called()
+        mock_get_openai_completion.assert_not_called()
+
+    @patch('app.INLINE_DOCUMENT_MAX_BYTES', 0)
+    @patch('app.cache_service')
+    @patch_chat_services
+    def test_chat_endpoint_caches_grounded_response(self, mock_cache_service, search_service, get_openai_completion, blob_service):
+        """Test that a response built on search results is written to the cache."""
+        mock_cache_service.get_chat.return_value = None
+        mock_cache_service.get_search.return_value = None
+        mock_cache_service.semantic_enabled = False
+        search_service.search_documents.return_value = MOCK_SEARCH_RESULTS
+        mock_completion = MagicMock()
+        mock_completion.choices = [MagicMock()]
+        mock_completion.choices[0].message.content = "Grounded answer."
+        get_openai_completion.return_value = mock_completion
+        blob_service.upload_document.return_value = "https://example.blob.core.windows.net/container/document.docx"
+
+        response = self.client.post(
+            '/api/chat',
+            data=orjson.dumps({"prompt": "What is the fund's ESG policy?"}),
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+        mock_cache_service.set_chat.assert_called_once_with(
+            "What is the fund's ESG policy?", orjson.loads(response.data)
+        )
+
+    @patch('app.INLINE_DOCUMENT_MAX_BYTES', 0)
+    @patch('app.cache_service')
+    @patch_chat_services
+    def test_chat_endpoint_does_not_cache_degraded_response(self, mock_cache_service, search_service, get_openai_completion, blob_service):
+        """Test that responses after a search error, an empty completion or a failed upload are not cached."""
+        mock_cache_service.get_chat.return_value = None
+        mock_cache_service.get_search.return_value = None
+        mock_cache_service.semantic_enabled = False
+        mock_completion = MagicMock()
+        mock_completion.choices = [MagicMock()]
+        get_openai_completion.return_value = mock_completion
+
+        cases = [
+            # (search error, completion content, uploaded document URL)
+            (True, "Ungrounded answer.", "https://example.blob.core.windows.net/container/document.docx"),
+            (False, None, "https://example.blob.core.windows.net/container/document.docx"),
+            (False, "Grounded answer.", None)
+        ]
+        for search_error, content, document_url in cases:
+            with self.subTest(search_error=search_error, content=content, document_url=document_url):
+                search_service.search_documents.reset_mock(return_value=True, side_effect=True)
+                if search_error:
+                    search_service.search_documents.side_effect = Exception("Service unavailable")
+                else:
+                    search_service.search_documents.return_value = MOCK_SEARCH_RESULTS
+                mock_completion.choices[0].message.content = content
+                blob_service.upload_document.return_value = document_url
+
+                response = self.client.post(
+                    '/api/chat',
+                    data=orjson.dumps({"prompt": "What is the fund's ESG policy?"}),
+                    content_type='application/json'
+                )
+
+                self.assertEqual(response.status_code, 200)
+                mock_cache_service.set_chat.assert_not_called()
+                mock_cache_service.set_semantic.assert_not_called()
+
     def test_chat_endpoint_missing_prompt(self):
         """Test the chat endpoint with missing prompt."""
         test_data = {
             "history": []
         }
         
-        response = self.app.post(
+        response = self.client.post(
             '/api/chat',
-            data=json.dumps(test_data),
+            data=orjson.dumps(test_data),
             content_type='application/json'
         )
         
         self.assertEqual(response.status_code, 400)
-        data = json.loads(response.data)
+        data = orjson.loads(response.data)
         self.assertIn('error', data)
         self.assertEqual(data['error'], "No prompt provided")
 
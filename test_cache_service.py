@@ -0,0 +1,71 @@
+# backend/test_cache_service.py
+
+import unittest
+from unittest.mock import patch, MagicMock
+import orjson
+import cache_service
+from cache_service import RedisCacheService
+
+EMBEDDING = [0.1] * cache_service.SEMANTIC_EMBEDDING_DIM
+CACHED_RESPONSE = {"ai_response": "Our ESG policy emphasizes responsible investment."}
+
+def make_knn_reply(score):
+    """Builds the FT.SEARCH reply for a single nearest neighbour at the given cosine distance."""
+    return [1, b"sem:abc", [b"response", orjson.dumps(CACHED_RESPONSE), b"score", str(score).encode()]]
+
+class TestRedisCacheService(unittest.TestCase):
+    """Test cases for the semantic response cache."""
+
+    def setUp(self):
+        """Create a service backed by a mocked Redis client with the vector index available."""
+        with patch('cache_service.redis.Redis.from_url') as mock_from_url:
+            self.client = mock_from_url.return_value
+            self.service = RedisCacheService("redis://localhost:6379/0")
+        self.assertTrue(self.service.semantic_enabled)
+        self.client.reset_mock()
+
+    def test_near_duplicate_prompt_is_a_hit(self):
+        """Test that a neighbour closer than SEMANTIC_MAX_DISTANCE returns its response."""
+        self.client.execute_command.return_value = make_knn_reply(0.01)
+
+        self.assertEqual(self.service.get_semantic(EMBEDDING), CACHED_RESPONSE)
+
+    def test_distant_prompt_is_a_miss(self):
+        """Test that neighbours at or beyond SEMANTIC_MAX_DISTANCE are ignored."""
+        for score in (cache_service.SEMANTIC_MAX_DISTANCE, 0.2):
+            with self.subTest(score=score):
+                self.client.execute_command.return_value = make_knn_reply(score)
+
+                self.assertIsNone(self.service.get_semantic(EMBEDDING))
+
+    def test_empty_index_is_a_miss(self):
+        """Test that a search with no neighbours returns None."""
+        self.client.execute_command.return_value = [0]
+
+        self.assertIsNone(self.service.get_semantic(EMBEDDING))
+
+    def test_embedding_dimension_mismatch_disables_semantic_cache(self):
+        """Test that embeddings of the wrong size turn the semantic cache off instead of querying it."""
+        embedding = [0.1] * (cache_service.SEMANTIC_EMBEDDING_DIM * 2)
+
+        self.assertIsNone(self.service.get_semantic(embedding))
+        self.service.set_semantic(embedding, "What is the ESG policy?", CACHED_RESPONSE, "gpt-4o")
+
+        self.assertFalse(self.service.semantic_enabled)
+        self.client.execute_command.assert_not_called()
+        self.client.pipeline.assert_not_called()
+
+    def test_semantic_write_stores_embedding_with_expiry(self):
+        """Test that a response is stored under the semantic prefix with its packed embedding."""
+        pipe = self.client.pipeline.return_value
+
+        self.service.set_semantic(EMBEDDING, "What is the ESG policy?", CACHED_RESPONSE, "gpt-4o", ttl=60)
+
+        key = pipe.hset.call_args.args[0]
+        self.assertTrue(key.startswith(cache_service.SEMANTIC_KEY_PREFIX))
+        self.assertEqual(pipe.hset.call_args.kwargs["mapping"]["embedding"], self.service.embedding_to_bytes(EMBEDDING))
+        pipe.expire.assert_called_once_with(key, 60)
+        pipe.execute.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+# backend/test_document_generator.py
+
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+from docx import Document
+import document_generator
+from document_generator import create_docx_document
+
+def read_document_xml(docx_bytes):
+    """Returns word/document.xml from a rendered DOCX."""
+    with zipfile.ZipFile(docx_bytes) as zf:
+        return zf.read("word/document.xml").decode("utf-8")
+
+def paragraph_texts(docx_bytes):
+    """Reopens a rendered DOCX with python-docx and returns its paragraph texts."""
+    docx_bytes.seek(0)
+    return [paragraph.text for paragraph in Document(docx_bytes).paragraphs]
+
+class TestDocumentGenerator(unittest.TestCase):
+    """Test cases for rendering DOCX responses from the precompiled template."""
+
+    def setUp(self):
+        """Make sure the tests exercise the template rather than the fallback."""
+        self.assertIsNotNone(document_generator._TEMPLATE)
+
+    def test_rendered_document_reopens(self):
+        """Test that the rendered document is a valid DOCX with the question and answer."""
+        docx_bytes = create_docx_document("What is the fund's ESG policy?", "Responsible investment.", ["ESG_Policy.pdf"])
+
+        texts = paragraph_texts(docx_bytes)
+
+        self.assertEqual(texts[0], "DDQ Response")
+        self.assertTrue(texts[1].startswith("Generated on: "))
+        self.assertIn("What is the fund's ESG policy?", texts)
+        self.assertIn("Responsible investment.", texts)
+
+    def test_text_is_escaped(self):
+        """Test that markup characters are escaped and XML-invalid control characters stripped."""
+        question = 'Is AUM < $1bn & rated "A"?\x01\x0b'
+
+        docx_bytes = create_docx_document(question, "No.")
+
+        document_xml = read_document_xml(docx_bytes)
+        self.assertIn("Is AUM &lt; $1bn &amp; rated &quot;A&quot;?</w:t>", document_xml)
+        self.assertIn('Is AUM < $1bn & rated "A"?', paragraph_texts(docx_bytes))
+
+    def test_newlines_become_line_breaks(self):
+        """Test that each newline in the answer becomes a line break within one paragraph."""
+        docx_bytes = create_docx_document("Question?", "First line\nSecond line")
+
+        self.assertIn('First line</w:t><w:br/><w:t xml:space="preserve">Second line', read_document_xml(docx_bytes))
+        self.assertIn("First line\nSecond line", paragraph_texts(docx_bytes))
+
+    def test_sources_heading_is_dropped_without_sources(self):
+        """Test that no Sources section is rendered when there are no sources."""
+        for sources in (None, []):
+            with self.subTest(sources=sources):
+                texts = paragraph_texts(create_docx_document("Question?", "Answer.", sources))
+
+                self.assertNotIn("Sources:", texts)
+                self.assertEqual(texts[-1], "Answer.")
+
+    def test_source_paragraph_repeats_per_source(self):
+        """Test that the source paragraph is rendered once per source, in order."""
+        texts = paragraph_texts(create_docx_document("Question?", "Answer.", ["ESG_Policy.pdf", "Q&A Bank.xlsx"]))
+
+        self.assertEqual(texts[-3:], ["Sources:", "• ESG_Policy.pdf", "• Q&A Bank.xlsx"])
+
+    def test_missing_or_malformed_template_is_not_loaded(self):
+        """Test that a missing, corrupt or placeholder-less template is rejected."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            corrupt_path = os.path.join(temp_dir, "corrupt.docx")
+            with open(corrupt_path, "wb") as f:
+                f.write(b"not a zip file")
+            placeholderless_path = os.path.join(temp_dir, "plain.docx")
+            with open(placeholderless_path, "wb") as f:
+                f.write(document_generator._build_docx_with_python_docx("Question?", "Answer.").getvalue())
+
+            for path in (os.path.join(temp_dir, "missing.docx"), corrupt_path, placeholderless_path):
+                with self.subTest(path=os.path.basename(path)):
+                    self.assertIsNone(document_generator._load_template(path))
+
+    @patch('document_generator._TEMPLATE', None)
+    def test_falls_back_to_python_docx_without_template(self):
+        """Test that documents are still produced through python-docx when the template is unavailable."""
+        with patch('document_generator._build_docx_with_python_docx',
+                   wraps=document_generator._build_docx_with_python_docx) as mock_build:
+            docx_bytes = create_docx_document("Question?", "Answer.", ["ESG_Policy.pdf"])
+
+        mock_build.assert_called_once_with("Question?", "Answer.", ["ESG_Policy.pdf"])
+        self.assertEqual(paragraph_texts(docx_bytes)[-1], "• ESG_Policy.pdf")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# backend/test_openai_service.py
+
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+from azure.ai.inference.models import UserMessage
+import openai_service
+
+class TestOpenAIService(unittest.TestCase):
+    """Test cases for the Azure OpenAI service helpers."""
+
+    @patch('openai_service.get_chat_client')
+    def test_completion_is_sent_directly(self, mock_get_chat_client):
+        """Test that a completion is sent on the calling thread without any batching delay."""
+        calling_thread = threading.current_thread()
+        mock_client = MagicMock()
+        mock_client.complete.side_effect = lambda **kwargs: threading.current_thread()
+        mock_get_chat_client.return_value = mock_client
+        messages = [UserMessage(content="What is the fund's ESG policy?")]
+
+        result = openai_service.get_openai_completion(messages, max_tokens=100)
+
+        self.assertIs(result, calling_thread)
+        mock_client.complete.assert_called_once_with(
+            messages=messages,
+            model=openai_service.AZURE_OAI_MODEL_NAME,
+            max_tokens=100,
+            stream=False
+        )
+
+    @patch('openai_service.get_chat_client')
+    def test_concurrent_completions_are_not_capped(self, mock_get_chat_client):
+        """Test that concurrent completions are all in flight at once."""
+        concurrency = 12
+        barrier = threading.Barrier(concurrency, timeout=5)
+        mock_client = MagicMock()
+        # Every call waits for all the others, so this only finishes if none of them is queued
+        mock_client.complete.side_effect = lambda **kwargs: barrier.wait()
+        mock_get_chat_client.return_value = mock_client
+
+        threads = [
+            threading.Thread(target=openai_service.get_openai_completion, args=([UserMessage(content="Hi")],))
+            for _ in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertFalse(barrier.broken)
+        self.assertEqual(mock_client.complete.call_count, concurrency)
+
+    @patch('openai_service.get_credential')
+    @patch('openai_service.ChatCompletionsClient')
+    def test_chat_client_outlives_gunicorn_timeout(self, mock_client_class, mock_get_credential):
+        """Test that the chat client's read timeout is not the short timeout used for search and blob."""
+        openai_service.get_chat_client.__wrapped__()
+
+        transport = mock_client_class.call_args.kwargs["transport"]
+        self.assertGreaterEqual(transport.connection_config.read_timeout, 120)
+
+if __name__ == '__main__':
+    unittest.main()
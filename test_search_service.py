@@ -0,0 +1,152 @@
+# backend/test_search_service.py
+
+import unittest
+from unittest.mock import patch, MagicMock
+from azure.core.exceptions import HttpResponseError
+import search_service
+from search_service import AzureSearchService
+
+def make_http_error(status_code, retry_after=None):
+    """Builds the HttpResponseError raised by the SDK for an error response."""
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {"Retry-After": retry_after} if retry_after is not None else {}
+    return HttpResponseError(message=f"HTTP {status_code}", response=response)
+
+def make_results(documents):
+    """Builds a search results iterator as returned by SearchClient.search."""
+    results = MagicMock()
+    results.__iter__.return_value = iter(documents)
+    results.get_count.return_value = len(documents)
+    return results
+
+class TestAzureSearchService(unittest.TestCase):
+    """Test cases for the Azure AI Search service."""
+
+    def setUp(self):
+        """Create a service with a mocked search client and an empty result cache."""
+        search_service._result_cache.clear()
+        with patch('search_service.SearchClient') as mock_search_client_class:
+            self.service = AzureSearchService("example", "ddq-index", "key")
+        self.client_kwargs = mock_search_client_class.call_args.kwargs
+        self.service.search_client = MagicMock()
+
+    def test_sdk_status_retries_are_disabled(self):
+        """Test that throttling is retried in one place only, not also in the SDK pipeline."""
+        self.assertEqual(self.client_kwargs["retry_status"], 0)
+
+    @patch.object(AzureSearchService._execute_search.retry, 'sleep')
+    def test_throttled_search_waits_for_retry_after(self, mock_sleep):
+        """Test that a 429 is retried after the service's Retry-After interval."""
+        self.service.search_client.search.side_effect = [
+            make_http_error(429, retry_after="2"),
+            make_results([{"id": "doc1", "content": "ESG", "sourceFile": "ESG_Policy.pdf", "@search.score": 1.0}])
+        ]
+
+        results = self.service.search_documents("ESG policy")
+
+        self.assertEqual(results["count"], 1)
+        self.assertEqual(self.service.search_client.search.call_count, 2)
+        mock_sleep.assert_called_once_with(2.0)
+
+    @patch.object(AzureSearchService._execute_search.retry, 'sleep')
+    def test_retry_after_is_capped(self, mock_sleep):
+        """Test that a long Retry-After is capped at MAX_RETRY_AFTER_SECONDS."""
+        self.service.search_client.search.side_effect = [
+            make_http_error(503, retry_after="120"),
+            make_results([])
+        ]
+
+        self.service.search_documents("ESG policy")
+
+        mock_sleep.assert_called_once_with(search_service.MAX_RETRY_AFTER_SECONDS)
+
+    @patch.object(AzureSearchService._execute_search.retry, 'sleep')
+    def test_transient_server_error_is_retried(self, mock_sleep):
+        """Test that a 500 from the service is retried rather than failing the search."""
+        self.service.search_client.search.side_effect = [
+            make_http_error(500),
+            make_results([{"id": "doc1", "content": "ESG", "sourceFile": "ESG_Policy.pdf", "@search.score": 1.0}])
+        ]
+
+        results = self.service.search_documents("ESG policy")
+
+        self.assertEqual(results["count"], 1)
+        self.assertEqual(results["results"][0]["id"], "doc1")
+        self.assertEqual(self.service.search_client.search.call_count, 2)
+
+    @patch.object(AzureSearchService._execute_search.retry, 'sleep')
+    def test_throttling_gives_up_after_four_attempts(self, mock_sleep):
+        """Test that persistent throttling is raised after a bounded number of requests."""
+        self.service.search_client.search.side_effect = make_http_error(429)
+
+        with self.assertRaises(HttpResponseError):
+            self.service.search_documents("ESG policy")
+
+        self.assertEqual(self.service.search_client.search.call_count, 4)
+
+    @patch.object(AzureSearchService._execute_search.retry, 'sleep')
+    def test_other_errors_are_not_retried(self, mock_sleep):
+        """Test that non-throttling errors are raised immediately."""
+        self.service.search_client.search.side_effect = make_http_error(400)
+
+        with self.assertRaises(HttpResponseError):
+            self.service.search_documents("ESG policy")
+
+        self.assertEqual(self.service.search_client.search.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    def test_repeated_query_is_served_from_cache(self):
+        """Test that a query differing only in case and surrounding whitespace skips the search."""
+        self.service.search_client.search.return_value = make_results(
+            [{"id": "doc1", "content": "ESG", "sourceFile": "ESG_Policy.pdf", "@search.score": 1.0}]
+        )
+
+        first = self.service.search_documents("ESG policy")
+        second = self.service.search_documents("  esg POLICY ")
+
+        self.assertIs(second, first)
+        self.service.search_client.search.assert_called_once()
+
+    def test_filter_and_top_are_part_of_the_cache_key(self):
+        """Test that the same text with a different filter or result count is searched again."""
+        self.service.search_client.search.side_effect = lambda **kwargs: make_results([])
+
+        self.service.search_documents("ESG policy")
+        self.service.search_documents("ESG policy", filter_condition="sourceFile eq 'ESG_Policy.pdf'")
+        self.service.search_documents("ESG policy", top=10)
+
+        self.assertEqual(self.service.search_client.search.call_count, 3)
+
+    def test_errors_are_not_cached(self):
+        """Test that a failed search is retried on the next call rather than cached."""
+        self.service.search_client.search.side_effect = [make_http_error(400), make_results([])]
+
+        with self.assertRaises(HttpResponseError):
+            self.service.search_documents("ESG policy")
+        results = self.service.search_documents("ESG policy")
+
+        self.assertEqual(results["count"], 0)
+        self.assertEqual(self.service.search_client.search.call_count, 2)
+
+    def test_batch_merges_duplicates_by_highest_score(self):
+        """Test that sub-query results are deduplicated by id, keeping the best score, and sorted."""
+        documents_by_query = {
+            "ESG policy": [
+                {"id": "doc1", "content": "ESG", "sourceFile": "ESG_Policy.pdf", "@search.score": 0.4},
+                {"id": "doc2", "content": "Climate", "sourceFile": "Climate.pdf", "@search.score": 0.7}
+            ],
+            "responsible investment": [
+                {"id": "doc1", "content": "ESG", "sourceFile": "ESG_Policy.pdf", "@search.score": 0.9},
+                {"id": "doc3", "content": "Stewardship", "sourceFile": "Stewardship.pdf", "@search.score": 0.2}
+            ]
+        }
+        self.service.search_client.search.side_effect = lambda **kwargs: make_results(documents_by_query[kwargs["search_text"]])
+
+        results = self.service.search_documents_batch(["ESG policy", "responsible investment"])
+
+        self.assertEqual(results["count"], 3)
+        self.assertEqual([(d["id"], d["score"]) for d in results["results"]], [("doc1", 0.9), ("doc2", 0.7), ("doc3", 0.2)])
+
+if __name__ == '__main__':
+    unittest.main()
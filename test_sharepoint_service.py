@@ -0,0 +1,281 @@
+# backend/test_sharepoint_service.py
+
+import os
+import shutil
+import threading
+import unittest
+from dataclasses import replace
+from unittest.mock import patch, MagicMock
+import orjson
+import requests
+import sharepoint_service
+from sharepoint_service import SharePointConfig, SharePointService
+
+GRAPH = "https://graph.microsoft.com/v1.0"
+DRIVE_ROOT = GRAPH + "/drives/b!drive/root"
+
+TEST_CONFIG = SharePointConfig(
+    tenant_id="tenant",
+    client_id="client",
+    client_secret="secret",
+    sharepoint_site_url="https://contoso.sharepoint.com/sites/ddq",
+    sharepoint_site_name="ddq",
+    document_library="Documents"
+)
+
+def make_response(status_code, body=b"", headers=None):
+    """Builds a fully read requests.Response, as returned by Session.request."""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = orjson.dumps(body) if isinstance(body, dict) else body
+    response._content_consumed = True
+    response.headers.update(headers or {})
+    return response
+
+class TestSharePointService(unittest.TestCase):
+    """Test cases for the SharePoint service, with every HTTP request stubbed."""
+
+    def setUp(self):
+        """Create a service whose session never reaches the network."""
+        self.service = SharePointService(config=TEST_CONFIG)
+        self.service.session.request = MagicMock()
+        self.requests = self.service.session.request
+
+    def tearDown(self):
+        self.service.close()
+
+    def resolve(self):
+        """Answer the site and drive lookups, leaving the request stub clean for the test."""
+        self.requests.side_effect = [
+            make_response(200, {"id": "site1"}),
+            make_response(200, {"value": [{"id": "b!other", "name": "Other"}, {"id": "b!drive", "name": "Documents"}]})
+        ]
+        self.assertEqual(self.service._drive_root, DRIVE_ROOT)
+        self.requests.reset_mock(side_effect=True)
+
+    def test_arguments_override_config(self):
+        """Test that settings passed to the constructor take precedence over the config."""
+        service = SharePointService(document_library="b!drive", config=TEST_CONFIG)
+
+        self.assertEqual(service.document_library, "b!drive")
+        self.assertEqual(service.tenant_id, "tenant")
+        service.close()
+
+    def test_site_name_is_not_required(self):
+        """Test that the site URL alone identifies the site."""
+        service = SharePointService(config=replace(TEST_CONFIG, sharepoint_site_name=None))
+        service.close()
+
+        with self.assertRaises(ValueError):
+            SharePointService(config=replace(TEST_CONFIG, sharepoint_site_url=None))
+
+    def test_access_token_is_cached(self):
+        """Test that one token request serves every call until the token nears expiry."""
+        self.requests.return_value = make_response(200, {"access_token": "token1", "expires_in": 3600})
+
+        self.assertEqual(self.service.get_access_token(), "token1")
+        self.assertEqual(self.service.get_access_token(), "token1")
+
+        self.requests.assert_called_once()
+        self.assertEqual(self.requests.call_args.args, ("POST", self.service.token_endpoint))
+
+    def test_ids_are_resolved_once(self):
+        """Test that the site and drive are looked up by name on first use only."""
+        self.resolve()
+
+        self.assertEqual(self.service._drive_path, "/drives/b!drive/root")
+        self.assertEqual(self.service._root_children_url, DRIVE_ROOT + "/children" + sharepoint_service.GRAPH_LIST_QUERY)
+        self.requests.assert_not_called()
+
+    def test_unknown_library_raises(self):
+        """Test that a library name with no matching drive is reported."""
+        self.requests.side_effect = [
+            make_response(200, {"id": "site1"}),
+            make_response(200, {"value": [{"id": "b!other", "name": "Other"}]})
+        ]
+
+        with self.assertRaises(RuntimeError):
+            self.service._resolve_ids()
+
+    def test_listing_follows_next_link(self):
+        """Test that every page of a folder listing is fetched."""
+        self.resolve()
+        next_link = DRIVE_ROOT + "/children?$skiptoken=page2"
+        self.requests.side_effect = [
+            make_response(200, {"value": [{"name": "a.pdf"}], "@odata.nextLink": next_link}),
+            make_response(200, {"value": [{"name": "b.pdf"}]})
+        ]
+
+        documents = self.service.list_folder("DDQ Documents")
+
+        self.assertEqual([d["name"] for d in documents], ["a.pdf", "b.pdf"])
+        self.assertEqual(self.requests.call_args_list[1].args, ("GET", next_link))
+
+    def test_batch_results_follow_input_order(self):
+        """Test that $batch sub-responses are matched to their folders whatever order they arrive in."""
+        self.resolve()
+        self.requests.return_value = make_response(200, {"responses": [
+            {"id": "1", "status": 200, "body": {"value": [{"name": "b.pdf"}]}},
+            {"id": "0", "status": 200, "body": {"value": [{"name": "a.pdf"}]}},
+            {"id": "2", "status": 404, "body": {}}
+        ]})
+
+        results = self.service.list_documents_batch(["A", "B", "Missing"])
+
+        self.assertEqual(results, [[{"name": "a.pdf"}], [{"name": "b.pdf"}], None])
+        self.requests.assert_called_once()
+        self.assertEqual(self.requests.call_args.args, ("POST", GRAPH + "/$batch"))
+
+    def test_batch_downloads_are_fetched_concurrently(self):
+        """Test that the download URLs a content $batch redirects to are fetched in parallel."""
+        self.resolve()
+        batch_response = make_response(200, {"responses": [
+            {"id": "0", "status": 302, "headers": {"Location": "https://download/a"}},
+            {"id": "1", "status": 302, "headers": {"Location": "https://download/b"}}
+        ]})
+        both_started = threading.Barrier(2, timeout=5)
+
+        def request(method, url, **kwargs):
+            if method == "POST":
+                return batch_response
+            # Blocks until the other download is in flight too
+            both_started.wait()
+            self.assertEqual(kwargs["timeout"], sharepoint_service.GRAPH_DOWNLOAD_TIMEOUT)
+            return make_response(200, url[-1].encode())
+        self.requests.side_effect = request
+
+        results = self.service.get_documents_content_batch(["a.pdf", "b.pdf"])
+
+        self.assertEqual(results, [b"a", b"b"])
+
+    def test_unchanged_listing_is_replayed_on_304(self):
+        """Test that a listing is revalidated with its ETag and served from the cache on a 304."""
+        self.resolve()
+        self.requests.side_effect = [
+            make_response(200, {"value": [{"name": "a.pdf"}]}, {"ETag": '"v1"'}),
+            make_response(304)
+        ]
+
+        first = self.service.list_folder("DDQ Documents")
+        second = self.service.list_folder("DDQ Documents")
+
+        self.assertEqual(second, first)
+        self.assertEqual(self.requests.call_args.kwargs["headers"], {"If-None-Match": '"v1"'})
+
+    def test_unchanged_download_is_replayed_on_304(self):
+        """Test that a small download is kept in memory and replayed on a 304."""
+        self.resolve()
+        self.requests.side_effect = [
+            make_response(200, b"policy text", {"ETag": '"v1"'}),
+            make_response(304)
+        ]
+
+        self.assertEqual(self.service.get_document_content("ESG Policy.pdf"), b"policy text")
+        self.assertEqual(self.service.get_document_content("ESG Policy.pdf"), b"policy text")
+        self.assertIsNone(self.service._etag_dir)
+
+    @patch('sharepoint_service.GRAPH_ETAG_MEMORY_MAX_BYTES', 4)
+    def test_large_download_is_replayed_from_disk(self):
+        """Test that a download above the memory limit is kept on disk instead."""
+        self.resolve()
+        self.requests.side_effect = [
+            make_response(200, b"policy text", {"ETag": '"v1"'}),
+            make_response(304)
+        ]
+
+        self.assertEqual(self.service.get_document_content("ESG Policy.pdf"), b"policy text")
+        self.assertEqual(self.service.get_document_content("ESG Policy.pdf"), b"policy text")
+        self.assertEqual(self.service._etag_bytes, 0)
+        self.assertEqual(self.service._etag_disk_bytes, len(b"policy text"))
+        self.assertIsNotNone(self.service._etag_dir)
+
+    @patch('sharepoint_service.GRAPH_ETAG_MEMORY_MAX_BYTES', 2)
+    @patch('sharepoint_service.GRAPH_ETAG_FILE_MAX_BYTES', 8)
+    def test_oversized_download_is_not_cached(self):
+        """Test that a download outgrowing the per-file limit is streamed and its spilled copy removed."""
+        self.resolve()
+        self.requests.side_effect = [make_response(200, b"policy text", {"ETag": '"v1"'})]
+
+        content = b"".join(self.service.iter_document_content("ESG Policy.pdf", chunk_size=4))
+
+        self.assertEqual(content, b"policy text")
+        self.assertIsNone(self.service._etag_get(DRIVE_ROOT + ":/ESG%20Policy.pdf:/content"))
+        self.assertEqual(os.listdir(self.service._etag_dir), [])
+
+    @patch('sharepoint_service.GRAPH_ETAG_DISK_MAX_BYTES', 10)
+    def test_disk_cache_is_bounded_by_bytes(self):
+        """Test that the oldest files are evicted and deleted once the on-disk total exceeds the budget."""
+        paths = []
+        for url in ("a", "b"):
+            fd, path = self.service._etag_tempfile()
+            os.write(fd, b"123456")
+            os.close(fd)
+            paths.append(path)
+            self.service._etag_put(url, '"v1"', path, 6)
+
+        self.assertIsNone(self.service._etag_get("a"))
+        self.assertFalse(os.path.exists(paths[0]))
+        self.assertTrue(os.path.exists(paths[1]))
+        self.assertEqual(self.service._etag_disk_bytes, 6)
+
+    @patch('sharepoint_service.atexit.register')
+    def test_disk_cache_is_removed_at_exit(self, mock_register):
+        """Test that the cache directory is cleaned up at exit even if close() is never called."""
+        fd, _ = self.service._etag_tempfile()
+        os.close(fd)
+
+        mock_register.assert_called_once_with(shutil.rmtree, self.service._etag_dir, ignore_errors=True)
+
+    @patch('sharepoint_service.GRAPH_ETAG_CACHE_MAX_BYTES', 10)
+    def test_etag_cache_is_bounded_by_bytes(self):
+        """Test that the oldest bodies are evicted once the in-memory total exceeds the budget."""
+        self.service._etag_put("a", '"v1"', b"123456", 6)
+        self.service._etag_put("b", '"v1"', b"123456", 6)
+
+        self.assertIsNone(self.service._etag_get("a"))
+        self.assertIsNotNone(self.service._etag_get("b"))
+        self.assertEqual(self.service._etag_bytes, 6)
+
+    @patch('sharepoint_service.time.sleep')
+    def test_throttled_request_pauses_for_retry_after(self, mock_sleep):
+        """Test that a 429 pauses for the capped Retry-After interval and is then retried."""
+        self.requests.side_effect = [
+            make_response(429, headers={"Retry-After": "120"}),
+            make_response(200, {"id": "site1"})
+        ]
+
+        response = self.service._graph_request("GET", GRAPH + "/sites/contoso.sharepoint.com")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.requests.call_count, 2)
+        mock_sleep.assert_called_once()
+        self.assertAlmostEqual(mock_sleep.call_args.args[0], sharepoint_service.MAX_RETRY_AFTER_SECONDS, delta=1)
+
+    @patch('sharepoint_service.time.sleep')
+    def test_unavailable_request_pauses_outside_the_adapter(self, mock_sleep):
+        """Test that a 503 gets the same capped pause as a 429, not an uncapped adapter retry."""
+        retries = self.service.session.get_adapter(GRAPH).max_retries
+        self.assertFalse(retries.respect_retry_after_header)
+        self.assertNotIn(503, retries.status_forcelist)
+        self.requests.side_effect = [
+            make_response(503, headers={"Retry-After": "3600"}),
+            make_response(200, {"id": "site1"})
+        ]
+
+        response = self.service._graph_request("GET", GRAPH + "/sites/contoso.sharepoint.com")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(mock_sleep.call_args.args[0], sharepoint_service.MAX_RETRY_AFTER_SECONDS, delta=1)
+
+    @patch('sharepoint_service.time.sleep')
+    def test_throttling_gives_up_after_retries(self, mock_sleep):
+        """Test that persistent throttling is returned after GRAPH_THROTTLE_RETRIES pauses."""
+        self.requests.side_effect = lambda *args, **kwargs: make_response(429, headers={"Retry-After": "1"})
+
+        response = self.service._graph_request("GET", GRAPH + "/sites/contoso.sharepoint.com")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.requests.call_count, sharepoint_service.GRAPH_THROTTLE_RETRIES + 1)
+
+if __name__ == '__main__':
+    unittest.main()